@@ -1,19 +1,91 @@
+import asyncio
+import logging
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from ssl import create_default_context
 from typing import AsyncGenerator
+from uuid import uuid4
 
+import config
 from config import DATABASE_URL
+from api.utils.metrics import db_pool_checkout_wait, db_pool_connections, registry
 
+# SSL is required by Neon; local SQLite/Postgres (benchmarks, development) can turn it off
+DATABASE_SSL = getattr(config, "DATABASE_SSL", not DATABASE_URL.startswith("sqlite"))
+DATABASE_REPLICA_URL = getattr(config, "DATABASE_REPLICA_URL", "")
+DB_POOL_SIZE = getattr(config, "DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = getattr(config, "DB_MAX_OVERFLOW", 20)
+DB_REPLICA_POOL_SIZE = getattr(config, "DB_REPLICA_POOL_SIZE", 10)
+DB_REPLICA_MAX_OVERFLOW = getattr(config, "DB_REPLICA_MAX_OVERFLOW", 20)
+DB_PGBOUNCER_MODE = getattr(config, "DB_PGBOUNCER_MODE", False)
+DB_SQLITE_BUSY_TIMEOUT = getattr(config, "DB_SQLITE_BUSY_TIMEOUT", 30)
+SCHEMA_UPGRADE_ATTEMPTS = 3
 ssl_context = create_default_context()
 
-engine = create_async_engine(
-    DATABASE_URL,
-    connect_args={"ssl": ssl_context},
-    pool_size=10,
-    max_overflow=20,
-    future=True,
-)
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    role = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start, role=self.role)
+
+
+def _connect_args(url: str) -> dict:
+    if url.startswith("sqlite"):
+        # SQLite allows one writer; large progress imports hold the lock long enough that
+        # concurrent writers would otherwise fail with "database is locked" instead of waiting
+        return {"timeout": DB_SQLITE_BUSY_TIMEOUT}
+    args = {"ssl": ssl_context} if DATABASE_SSL else {}
+    if DB_PGBOUNCER_MODE:
+        # transaction-mode poolers (pgbouncer, the Neon -pooler endpoint) can run each transaction on a
+        # different server connection, so statements prepared and cached on one are missing on the next
+        args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+        )
+    return args
+
+
+def build_engine(url: str, role: str, pool_size: int, max_overflow: int):
+    return create_async_engine(
+        url,
+        connect_args=_connect_args(url),
+        # the subclass carries the metrics label and survives pool.recreate() on dispose
+        poolclass=type(f"{role.title()}Pool", (InstrumentedPool,), {"role": role}),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        future=True,
+    )
+
+
+engine = build_engine(DATABASE_URL, "primary", DB_POOL_SIZE, DB_MAX_OVERFLOW)
+# without a replica, reads go to the primary
+replica_engine = build_engine(DATABASE_REPLICA_URL, "replica", DB_REPLICA_POOL_SIZE, DB_REPLICA_MAX_OVERFLOW) if DATABASE_REPLICA_URL else engine
+
+
+def collect_pool_metrics():
+    for role, db_engine in (("primary", engine), ("replica", replica_engine)):
+        pool = db_engine.sync_engine.pool
+        if not isinstance(pool, QueuePool) or (role == "replica" and db_engine is engine):
+            continue
+        db_pool_connections.set(pool.size(), role=role, state="size")
+        db_pool_connections.set(pool.checkedout(), role=role, state="checked_out")
+        db_pool_connections.set(pool.checkedin(), role=role, state="idle")
+        db_pool_connections.set(max(pool.overflow(), 0), role=role, state="overflow")
+
+
+registry.add_collector(collect_pool_metrics)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -23,8 +95,77 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
+ReadSessionLocal = sessionmaker(
+    bind=replica_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    autocommit=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
+
+def session_scope(readonly: bool = False) -> AsyncSession:
+    return ReadSessionLocal() if readonly else AsyncSessionLocal()
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
+    async with session_scope() as session:
         yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with session_scope(readonly=True) as session:
+        yield session
+
+
+if replica_engine is engine:
+    # FastAPI caches dependencies per request by function, so aliasing keeps a request that
+    # mixes read and write dependencies on one session and one pooled connection
+    get_read_db = get_db
+
+
+async def dispose_engines():
+    await engine.dispose()
+    if replica_engine is not engine:
+        await replica_engine.dispose()
+
+
+async def ensure_schema(version: int) -> int:
+    # one indexed read on a warm database instead of create_all's per-table reflection round trips
+    try:
+        async with engine.connect() as conn:
+            current = (await conn.execute(text("SELECT max(version) FROM schema_version"))).scalar()
+    except DBAPIError:
+        current = None
+
+    if current is not None and current >= version:
+        if current > version:
+            logger.warning("Database schema version %s is newer than this build (%s)", current, version)
+        return current
+
+    logger.info("Database schema version %s is older than %s, creating missing tables", current, version)
+    for attempt in range(SCHEMA_UPGRADE_ATTEMPTS):
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(
+                    text("INSERT INTO schema_version (version) VALUES (:version) ON CONFLICT (version) DO NOTHING"),
+                    {"version": version},
+                )
+            return version
+        except DBAPIError:
+            # workers starting together race on the same CREATE TABLE; the next pass skips what the others created
+            if attempt == SCHEMA_UPGRADE_ATTEMPTS - 1:
+                raise
+            logger.info("Schema upgrade raced with another worker, retrying")
+
+
+async def prewarm_pool(connections: int):
+    # pays the TCP/TLS/auth handshakes during startup rather than on the first requests
+    engines = [engine] if replica_engine is engine else [engine, replica_engine]
+    opened = await asyncio.gather(*(db_engine.connect() for db_engine in engines for _ in range(connections)))
+    for conn in opened:
+        await conn.close()
+
@@ -1,12 +1,23 @@
 from __future__ import annotations
 import random
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy import ForeignKey, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import ForeignKey, func, Float, Index, Integer, LargeBinary, String, Boolean, DateTime, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .database import Base  
 
+# bump whenever a table is added; startup then runs create_all once, which only creates missing tables.
+# Indexes and columns added to existing tables are never created by it and go in migrate_chart_data.py
+SCHEMA_VERSION = 2
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
 class User(Base):
     __tablename__ = "users"
 
@@ -38,7 +49,62 @@ class RecentImport(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.userid"), nullable=False)
     prediction: Mapped[str] = mapped_column(Text, nullable=False)
-    chart_data: Mapped[str] = mapped_column(Text, nullable=False)
+    chart_data: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    chart_blob: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     user: Mapped[User] = relationship("User", back_populates="recent_imports")
+
+
+# prefix search in /admin-panel-users; text_pattern_ops keeps LIKE 'q%' indexable under any collation.
+# Existing databases get these from migrate_chart_data.py
+Index(
+    "ix_users_username_prefix",
+    func.lower(User.username).label("username_prefix"),
+    postgresql_ops={"username_prefix": "text_pattern_ops"},
+)
+Index(
+    "ix_users_email_prefix",
+    func.lower(User.email).label("email_prefix"),
+    postgresql_ops={"email_prefix": "text_pattern_ops"},
+)
+
+
+# keyset pagination of /recent-imports; existing databases get it from migrate_chart_data.py
+Index(
+    "ix_recent_imports_user_created_id",
+    RecentImport.user_id,
+    RecentImport.created_at.desc(),
+    RecentImport.id.desc(),
+)
+
+
+class PredictionCache(Base):
+    __tablename__ = "prediction_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    prediction: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ProjectProgress(Base):
+    __tablename__ = "project_progress"
+
+    project_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    days_elapsed: Mapped[int] = mapped_column(Integer, primary_key=True)
+    days_remaining: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    planned_progress: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    actual_progress: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    materials_used: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    workforce: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    updated_by: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ProjectForecast(Base):
+    __tablename__ = "project_forecasts"
+
+    project_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    forecast: Mapped[str] = mapped_column(Text, nullable=False)
+    rows: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,17 @@
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from api.utils.metrics import registry
+import config
+
+METRICS_TOKEN = getattr(config, "METRICS_TOKEN", "")
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(authorization: str = Header(default="")):
+    if METRICS_TOKEN and not secrets.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
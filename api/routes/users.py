@@ -1,32 +1,46 @@
 from __future__ import annotations  
 import random
-import boto3
-import os, io, json
-import pandas as pd
-from PIL import Image
-import google.generativeai as genai
-from typing import List
-
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+import os, json
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import and_, func, or_, text
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api import schemas, models, auth
 
 from api.utils.utils import *
+from api.utils.hashing import password_hasher
+from api.utils.llm import llm_client
+from api.utils.prompts import PROMPT_TOKEN_BUDGET, PROMPT_VERSION, build_prompt, prompt_metrics
+from api.utils.cache import prediction_cache, user_cache
+from api.utils.ingest import UploadIngest, as_float64, ingest_csv
+from api.utils.progress import progress_records, refresh_forecasts, stored_forecasts, upsert_progress
+from api.utils.predictor import BATCH_MAX_PROJECTS, predict_frame, predict_projects
+from api.utils.jobs import QueueFull, job_queue, queue_full_error
+from api.utils.chart_codec import encode_chart, load_chart_data, load_chart_frame
+from api.utils.downsample import MIN_POINTS, chart_cache, downsample_frame
+from api.utils.responses import ETAG_CACHE_CONTROL, FastJSONResponse, etag_matches, make_etag, not_modified
+from api.utils.logs import LOG_FILE, read_log_tail, read_log_from
+from api.utils.storage import StorageBackend, get_storage, IMMUTABLE_CACHE_CONTROL
+from api.utils.images import IMAGE_MAX_BYTES, ImageTooLarge, process_avatar_async
+from api.database import AsyncSessionLocal, session_scope
 
 import config
 
-genai.configure(api_key=config.GEMINI_API_KEY)
-
 router = APIRouter()
 
 @router.put("/change-username", response_model=schemas.UserBase)
 async def change_username(
     update: schemas.ChangeUsername,
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(get_current_user_for_update),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
@@ -41,6 +55,7 @@ async def change_username(
     
     current_user.username = update.new_username
     await db.commit()
+    user_cache.invalidate(current_user.userid)
     await db.refresh(current_user)
     return current_user
 
@@ -56,7 +71,7 @@ async def signup(
     if db_user:
         raise HTTPException(status_code=400, detail="Username unavailable")
     
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     new_user = models.User(
         username=user.username,
         email=user.email,
@@ -78,12 +93,19 @@ async def login(
         select(models.User).filter(models.User.username == form_data.username)
     )
     db_user = result.scalar_one_or_none()
-    if not db_user or not auth.verify_password(form_data.password, db_user.hashed_password):
+    verified, new_hash = False, None
+    if db_user:
+        verified, new_hash = await password_hasher.verify_and_update(form_data.password, db_user.hashed_password)
+    if not db_user or not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
+        user_cache.invalidate(db_user.userid)
     
     access_token = auth.create_access_token(
         data={"sub": db_user.username, "userid": db_user.userid, "is_sudo": db_user.is_sudo}
@@ -117,36 +139,134 @@ async def refresh_token(token: str):
     )
     return {"access_token": new_access_token, "token_type": "bearer"}
 
+RECENT_IMPORTS_PAGE_SIZE = 20
+RECENT_IMPORTS_MAX_PAGE_SIZE = 100
+
+def recent_import_chart(import_entry, max_points: Optional[int] = None) -> list:
+    if not max_points:
+        return load_chart_data(import_entry.chart_blob, import_entry.chart_data)
+    # stored imports never change, so each (import, resolution) pair is computed once
+    key = (import_entry.id, max_points)
+    chart_data = chart_cache.get(key)
+    if chart_data is None:
+        frame = load_chart_frame(import_entry.chart_blob, import_entry.chart_data)
+        chart_data = downsample_frame(frame, max_points).to_dict(orient="records")
+        chart_cache.set(key, chart_data)
+    return chart_data
+
+def serialize_recent_import(import_entry, max_points: Optional[int] = None) -> dict:
+    return {
+        "id": import_entry.id,
+        "chart_data": recent_import_chart(import_entry, max_points),
+        "prediction": import_entry.prediction,
+        "created_at": import_entry.created_at.isoformat(),
+    }
+
 @router.get("/recent-imports")
 async def get_recent_imports(
+    request: Request,
+    limit: int = Query(RECENT_IMPORTS_PAGE_SIZE, ge=1, le=RECENT_IMPORTS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+    max_points: Optional[int] = Query(None, ge=MIN_POINTS),
     current_user: models.User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(
-        select(models.RecentImport)
-        .filter(models.RecentImport.user_id == current_user.userid)
-        .order_by(models.RecentImport.created_at.desc())
+    RecentImport = models.RecentImport
+    # imports are append-only, so the newest one identifies every page; this lookup is served
+    # by the (user_id, created_at, id) index and skips the blob query when the client is current
+    latest = (await db.execute(
+        select(RecentImport.id, RecentImport.created_at)
+        .where(RecentImport.user_id == current_user.userid)
+        .order_by(RecentImport.created_at.desc(), RecentImport.id.desc())
+        .limit(1)
+    )).first()
+    etag = make_etag(
+        "recent-imports", current_user.userid, list(latest) if latest else None, limit, cursor, summary, max_points
     )
-    recent_imports = result.scalars().all()
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    if not recent_imports:
-        return []
-    
-    response_data = [
-        {
-            "chart_data": json.loads(import_entry.chart_data),
-            "prediction": import_entry.prediction,  
-            "created_at": import_entry.created_at.isoformat(),
-        }
-        for import_entry in recent_imports
-    ]
-    
-    sanitized_response = sanitize_nans(response_data)
-    return JSONResponse(content=sanitized_response)
+    if summary:
+        query = select(
+            RecentImport.id,
+            RecentImport.created_at,
+            func.substr(RecentImport.prediction, 1, 200).label("prediction_preview"),
+        )
+    else:
+        query = select(RecentImport)
+    query = (
+        query.where(RecentImport.user_id == current_user.userid)
+        .order_by(RecentImport.created_at.desc(), RecentImport.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        try:
+            created_at, import_id = decode_cursor(cursor)
+            created_at = datetime.fromisoformat(created_at)
+            # bool is an int subclass, but True is not an id
+            if type(import_id) is not int:
+                raise TypeError("import id cursor must be an integer")
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(
+            or_(
+                RecentImport.created_at < created_at,
+                and_(RecentImport.created_at == created_at, RecentImport.id < import_id),
+            )
+        )
+
+    result = await db.execute(query)
+    rows = result.all() if summary else result.scalars().all()
+    headers = {"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    if summary:
+        response_data = [
+            {
+                "id": row.id,
+                "created_at": row.created_at.isoformat(),
+                "prediction_preview": row.prediction_preview,
+            }
+            for row in rows
+        ]
+    else:
+        response_data = [serialize_recent_import(import_entry, max_points) for import_entry in rows]
+
+    return FastJSONResponse(content=response_data, headers=headers)
+
+@router.get("/recent-imports/{import_id}")
+async def get_recent_import(
+    request: Request,
+    import_id: int,
+    max_points: Optional[int] = Query(None, ge=MIN_POINTS),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # a stored import never changes, and the tag is only ever issued to its owner
+    etag = make_etag("recent-import", current_user.userid, import_id, max_points)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    result = await db.execute(
+        select(models.RecentImport).where(
+            models.RecentImport.id == import_id,
+            models.RecentImport.user_id == current_user.userid,
+        )
+    )
+    import_entry = result.scalar_one_or_none()
+    if not import_entry:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return FastJSONResponse(
+        content=serialize_recent_import(import_entry, max_points),
+        headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL},
+    )
 
 @router.get("/protected")
-async def protected_route(current_user: models.User = Depends(get_current_user)):
-    return {
+async def protected_route(request: Request, current_user: models.User = Depends(get_current_user)):
+    profile = {
         "username": current_user.username,
         "email": current_user.email,
         "joined_date": current_user.joined_date.isoformat(),
@@ -155,6 +275,10 @@ async def protected_route(current_user: models.User = Depends(get_current_user))
         "is_sudo": current_user.is_sudo,
         "role": "Admin" if current_user.is_sudo else "Member"
     }
+    etag = make_etag("profile", profile)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(content=profile, headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL})
 
 @router.get("/admin")
 async def admin_only_route(current_user: models.User = Depends(require_sudo)):
@@ -163,28 +287,102 @@ async def admin_only_route(current_user: models.User = Depends(require_sudo)):
 @router.post("/change-password")
 async def change_password(
     request: schemas.ChangePassword,
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(get_current_user_for_update),
     db: AsyncSession = Depends(get_db)
 ):
-    if not auth.verify_password(request.old_password, current_user.hashed_password):
+    if not await password_hasher.verify(request.old_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Old password is incorrect."
         )
     
-    current_user.hashed_password = auth.get_password_hash(request.new_password)
+    current_user.hashed_password = await password_hasher.hash(request.new_password)
     await db.commit()
+    user_cache.invalidate(current_user.userid)
     
     return {"message": "Password changed successfully."}
 
+ADMIN_USERS_PAGE_SIZE = 50
+ADMIN_USERS_MAX_PAGE_SIZE = 500
+ADMIN_USERS_COUNT_CAP = 10000
+ADMIN_USERS_EXPORT_BATCH = 1000
+
+def admin_users_query(q: Optional[str], role: str):
+    User = models.User
+    query = select(User.userid, User.username, User.is_sudo)
+    if q:
+        # case-insensitive prefix match, written as lower(column) LIKE 'q%' so the
+        # lower(...) text_pattern_ops indexes on users can serve it
+        prefix = q.lower()
+        query = query.where(or_(
+            func.lower(User.username).startswith(prefix, autoescape=True),
+            func.lower(User.email).startswith(prefix, autoescape=True),
+        ))
+    if role == "admin":
+        query = query.where(User.is_sudo.is_(True))
+    elif role == "user":
+        query = query.where(User.is_sudo.is_not(True))
+    return query
+
+async def count_admin_users(db: AsyncSession, query, filtered: bool):
+    if not filtered and db.bind.dialect.name == "postgresql":
+        # planner statistics instead of a full scan; -1 means the table was never analyzed
+        estimate = (await db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'users'::regclass"))).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate, False
+    capped = select(func.count()).select_from(query.limit(ADMIN_USERS_COUNT_CAP + 1).subquery())
+    count = (await db.execute(capped)).scalar_one()
+    return min(count, ADMIN_USERS_COUNT_CAP), count <= ADMIN_USERS_COUNT_CAP
+
 @router.get("/admin-panel-users", response_model=List[schemas.UserBase])
 async def get_all_users(
+    limit: int = Query(ADMIN_USERS_PAGE_SIZE, ge=1, le=ADMIN_USERS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    role: Literal["all", "admin", "user"] = "all",
+    output: Literal["json", "ndjson"] = Query("json", alias="format"),
     current_user: models.User = Depends(require_sudo),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(select(models.User))
-    users = result.scalars().all()
-    return users
+    query = admin_users_query(q, role).order_by(models.User.username)
+
+    if output == "ndjson":
+        async def export():
+            # the request session is closed before the body streams, so the export opens its own;
+            # stream() reads through a server-side cursor one batch at a time
+            async with session_scope(readonly=True) as session:
+                result = await session.stream(query.execution_options(yield_per=ADMIN_USERS_EXPORT_BATCH))
+                async for rows in result.partitions():
+                    yield b"".join(dumps(row._asdict()) + b"\n" for row in rows)
+
+        return StreamingResponse(
+            export(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="users.ndjson"'},
+        )
+
+    headers = {}
+    if cursor:
+        try:
+            (after,) = decode_cursor(cursor)
+            if not isinstance(after, str):
+                raise TypeError("username cursor must be a string")
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page_query = query.where(models.User.username > after)
+    else:
+        # the total only goes with the first page
+        total, exact = await count_admin_users(db, admin_users_query(q, role), filtered=bool(q) or role != "all")
+        headers["X-Total-Count"] = str(total)
+        headers["X-Total-Count-Exact"] = str(exact).lower()
+        page_query = query
+
+    rows = (await db.execute(page_query.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].username)
+
+    return FastJSONResponse(content=[row._asdict() for row in rows], headers=headers)
 
 @router.put("/admin-panel", response_model=schemas.UserBase)
 async def admin_panel_update(
@@ -200,12 +398,13 @@ async def admin_panel_update(
         raise HTTPException(status_code=404, detail="User not found")
     
     if update.new_password:
-        target_user.hashed_password = auth.get_password_hash(update.new_password)
+        target_user.hashed_password = await password_hasher.hash(update.new_password)
     
     if update.is_admin is not None:
         target_user.is_sudo = update.is_admin
 
     await db.commit()
+    user_cache.invalidate(target_user.userid)
     await db.refresh(target_user)
     return target_user
 
@@ -224,58 +423,181 @@ async def delete_user(
     
     await db.delete(target_user)
     await db.commit()
+    user_cache.invalidate(target_user.userid)
     return target_user
 
 @router.post("/predict", response_model=dict)
 async def predict_completion(
     file: UploadFile = File(...),
+    mode: Literal["local", "llm", "hybrid"] = "hybrid",
+    no_cache: bool = False,
+    max_points: Optional[int] = Query(None, ge=MIN_POINTS),
     current_user: models.User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        df = pd.read_csv(file.file)
+        upload = await run_in_threadpool(ingest_csv, file, header_check=check_progress_header, keep_frame=True)
+        df = upload.frame
         print("CSV Columns:", df.columns.tolist())
-        df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
-        column_mapping = {"progress_percent": "actual_progress"}
-        df.rename(columns=column_mapping, inplace=True)
-        if "days_elapsed" not in df.columns or "days_remaining" not in df.columns:
-            raise HTTPException(status_code=400, detail="Missing required columns: days_elapsed and/or days_remaining.")
-        if "planned_progress" not in df.columns:
-            df["planned_progress"] = (df["days_elapsed"] / (df["days_elapsed"] + df["days_remaining"])) * 100
-
-        required_columns = ["days_elapsed", "planned_progress", "actual_progress"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(missing_columns)}. Check CSV format.")
-
-        extracted_data = df[required_columns].to_dict(orient="records")
-        progress_summary = df.to_string()
-
-        prompt = [
-            "You are an AI-powered construction assistant.", 
-            "Get the insights and forecast based on the data with current trends in real-time.",
-            "Make it 10 lines with points wise in new line for each point.",
-            f"Input data:\n{progress_summary}",
-        ]
-        if model is None:
-            raise HTTPException(status_code=500, detail="AI model not initialized.")
-        ai_response = model.generate_content(prompt)
+        df = normalize_progress_frame(df)
+
+        extracted_data = as_float64(downsample_frame(df[CHART_COLUMNS], max_points)).to_dict(orient="records")
+        result = await predict_frame(db, df, mode=mode, no_cache=no_cache)
 
         recent = models.RecentImport(
             user_id=current_user.userid,
-            prediction=ai_response.text,  
-            chart_data=json.dumps(extracted_data)
+            prediction=result["prediction"],
+            chart_blob=encode_chart(df[CHART_COLUMNS])
         )
         db.add(recent)
         await db.commit()
         
-        return {"prediction": ai_response.text, "chart_data": extracted_data}
+        return FastJSONResponse(content={**result, "chart_data": extracted_data, "validation": upload.validation})
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
     
+@router.post("/predict/batch")
+async def predict_batch(
+    file: UploadFile = File(...),
+    mode: Literal["local", "llm", "hybrid"] = "hybrid",
+    no_cache: bool = False,
+    max_points: Optional[int] = Query(None, ge=MIN_POINTS),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    upload = await run_in_threadpool(ingest_csv, file, header_check=check_progress_header, keep_frame=True)
+    df = normalize_progress_frame(upload.frame)
+    if "project_id" not in df.columns:
+        raise HTTPException(status_code=400, detail="Missing required column: project_id.")
+    project_count = df["project_id"].nunique()
+    if project_count > BATCH_MAX_PROJECTS:
+        raise HTTPException(status_code=400, detail=f"Upload has {project_count} projects; the batch limit is {BATCH_MAX_PROJECTS}.")
+
+    results = await predict_projects(df, mode=mode, no_cache=no_cache)
+
+    succeeded = [result for result in results if result["status"] == "succeeded"]
+    recent_imports = [
+        models.RecentImport(
+            user_id=current_user.userid,
+            prediction=result["prediction"],
+            chart_blob=encode_chart(result["frame"][CHART_COLUMNS])
+        )
+        for result in succeeded
+    ]
+    # one transaction and one multi-row INSERT for the whole portfolio
+    db.add_all(recent_imports)
+    await db.commit()
+
+    for result, recent in zip(succeeded, recent_imports):
+        result["recent_import_id"] = recent.id
+    for result in results:
+        result["chart_data"] = as_float64(downsample_frame(result.pop("frame")[CHART_COLUMNS], max_points)).to_dict(orient="records")
+
+    return FastJSONResponse(content={
+        "results": results,
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "validation": upload.validation,
+    })
+
+@router.post("/predict/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_prediction_job(
+    file: UploadFile = File(...),
+    mode: Literal["local", "llm", "hybrid"] = "hybrid",
+    no_cache: bool = False,
+    current_user: models.User = Depends(get_current_user)
+):
+    upload = await run_in_threadpool(ingest_csv, file, header_check=check_progress_header, keep_frame=True)
+    df = normalize_progress_frame(upload.frame)
+    try:
+        job = await job_queue.submit(
+            "forecast",
+            current_user.userid,
+            {"frame": df, "mode": mode, "no_cache": no_cache, "user_id": current_user.userid},
+        )
+    except QueueFull:
+        raise queue_full_error()
+    return {"job_id": job.id, "status": job.status}
+
+@router.get("/predict/jobs/{job_id}")
+async def get_prediction_job(
+    job_id: str,
+    current_user: models.User = Depends(get_current_user)
+):
+    job = await job_queue.get(job_id)
+    if not job or job.owner_id != current_user.userid:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return FastJSONResponse(content=job.to_dict())
+
+@router.post("/predict/stream")
+async def predict_completion_stream(
+    file: UploadFile = File(...),
+    no_cache: bool = False,
+    max_points: Optional[int] = Query(None, ge=MIN_POINTS),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    upload = await run_in_threadpool(ingest_csv, file, header_check=check_progress_header, keep_frame=True)
+    df = normalize_progress_frame(upload.frame)
+
+    chart_frame = df[CHART_COLUMNS]
+    extracted_data = as_float64(downsample_frame(chart_frame, max_points)).to_dict(orient="records")
+    user_id = current_user.userid
+    cache_key = await run_in_threadpool(prediction_cache.key_for, df, f"{PROMPT_VERSION}:{PROMPT_TOKEN_BUDGET}")
+    cached_prediction = None
+    if no_cache:
+        prediction_cache.bypassed += 1
+    else:
+        cached_prediction = await prediction_cache.get(db, cache_key)
+    if cached_prediction is None:
+        llm_client.require_model()
+        prompt, _ = await run_in_threadpool(build_prompt, df)
+
+    async def event_stream():
+        yield sse_event("chart_data", extracted_data)
+        if cached_prediction is not None:
+            prediction = cached_prediction
+            yield sse_event("token", {"text": prediction})
+        else:
+            parts = []
+            try:
+                async for text in llm_client.stream(prompt):
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+            except Exception as e:
+                logging.exception("Streaming prediction failed")
+                yield sse_event("error", {"detail": str(e)})
+                return
+            prediction = "".join(parts)
+
+        # the request-scoped session is already closed once streaming starts
+        async with AsyncSessionLocal() as session:
+            if cached_prediction is None:
+                await prediction_cache.set(session, cache_key, prediction)
+            recent = models.RecentImport(
+                user_id=user_id,
+                prediction=prediction,
+                chart_blob=encode_chart(chart_frame)
+            )
+            session.add(recent)
+            await session.commit()
+        yield sse_event("done", {"id": recent.id, "prediction": prediction, "cached": cached_prediction is not None})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/admin/cache-stats")
+async def get_cache_stats(current_user: models.User = Depends(require_sudo)):
+    return {"users": user_cache.stats(), "predictions": prediction_cache.stats(), "jobs": job_queue.stats(), "prompts": prompt_metrics.stats()}
+
 @router.post("/import-csv")
 async def import_csv(
     file: UploadFile = File(...),
@@ -283,95 +605,146 @@ async def import_csv(
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        df = pd.read_csv(file.file)
-        expected_columns = {"project_id", "progress_percent", "materials_used", "workforce", "days_elapsed", "days_remaining"}
-        if not expected_columns.issubset(set(df.columns)):
-            raise HTTPException(status_code=400, detail="CSV format is invalid. Expected columns: " + ", ".join(expected_columns))
-        
-        preview = df.head().to_dict(orient="records")
+        # rows are upserted chunk by chunk as they are parsed; only the ids of changed projects are kept.
+        # Parsing runs in the threadpool, the upserts between chunks on the event loop
+        upload = UploadIngest(file, header_check=check_import_header)
+        chunks = upload.chunks()
+        changed_rows, skipped = 0, 0
+        changed_projects = set()
+        while True:
+            chunk = await run_in_threadpool(next, chunks, None)
+            if chunk is None:
+                break
+            records, chunk_skipped = progress_records(normalize_progress_frame(chunk))
+            chunk_changed, chunk_projects = await upsert_progress(db, records, current_user.userid)
+            changed_rows += chunk_changed
+            skipped += chunk_skipped
+            changed_projects |= chunk_projects
+        result = upload.result()
+        # only projects with new or modified days are re-forecast
+        await refresh_forecasts(db, changed_projects)
+        await db.commit()
         return {
             "message": "CSV imported successfully",
-            "rows": df.shape[0],
-            "columns": list(df.columns),
-            "preview": preview,
+            "rows": result.rows,
+            "columns": result.columns,
+            "preview": result.preview,
+            "changed_rows": changed_rows,
+            "skipped_rows": skipped,
+            "validation": result.validation,
+            "reforecast_projects": sorted(changed_projects),
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/projects/forecasts")
+async def get_project_forecasts(
+    project_id: Optional[List[int]] = Query(None),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    return FastJSONResponse(content=await stored_forecasts(db, project_id))
+
 @router.post("/upload-profile-pic")
 async def upload_profile_pic(
     profile_pic: UploadFile = File(...),
-    current_user: models.User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: models.User = Depends(get_current_user_for_update),
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
 ):
     if not profile_pic.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Invalid file type. Only image files are allowed.")
     
-    file_extension = os.path.splitext(profile_pic.filename)[1]
-    
-    file_name = f"profile_pic_{current_user.userid}.jpg"
-    s3_key = f"static/{file_name}"
+    if profile_pic.size is not None and profile_pic.size > IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image exceeds the {IMAGE_MAX_BYTES} byte limit.")
     
-    content = await profile_pic.read()
+    content = await profile_pic.read(IMAGE_MAX_BYTES + 1)
+    if len(content) > IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image exceeds the {IMAGE_MAX_BYTES} byte limit.")
     try:
-        image = Image.open(io.BytesIO(content))
-    except Exception:
+        variants = await process_avatar_async(content)
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError:
         raise HTTPException(status_code=400, detail="Unable to open image.")
     
-    if image.mode != "RGB":
-        image = image.convert("RGB")
-    
-    image.thumbnail((200, 200))
-    
-    buffer = io.BytesIO()
-    image.save(buffer, format="JPEG", quality=70)
-    buffer.seek(0)
-    
-    
-    s3_client = boto3.client(
-        's3',
-        region_name=config.AWS_BUCKET_REGION,
-        aws_access_key_id=config.AWS_ACCESS_KEY,
-        aws_secret_access_key=config.AWS_SECRET_KEY
-    )
+    # content-hashed names never change, so clients and the CDN can cache them forever
+    keys = [
+        f"static/profile_pic_{current_user.userid}_{variant.size}_{variant.digest}.jpg"
+        for variant in variants
+    ]
     try:
-        
-        s3_client.upload_fileobj(
-            buffer,
-            config.AWS_BUCKET_NAME,
-            s3_key,
-            ExtraArgs={'ContentType': 'image/jpeg'}
-        )
+        urls = await asyncio.gather(*(
+            storage.put(key, variant.data, "image/jpeg", cache_control=IMMUTABLE_CACHE_CONTROL)
+            for key, variant in zip(keys, variants)
+        ))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error uploading file to S3: {str(e)}")
-    
-    profile_pic_url = f"{config.CLOUDFRONT_DOMAIN}{s3_key}"
+        raise HTTPException(status_code=500, detail=f"Error uploading file to storage: {str(e)}")
     
+    profile_pic_url = urls[0]
     current_user.profile_pic = profile_pic_url
     await db.commit()
+    user_cache.invalidate(current_user.userid)
     await db.refresh(current_user)
     
-    return {"profile_pic": profile_pic_url}
+    return {
+        "profile_pic": profile_pic_url,
+        "variants": {str(variant.size): url for variant, url in zip(variants, urls)},
+    }
+
+LOGS_PAGE_SIZE = 200
+LOGS_MAX_PAGE_SIZE = 2000
+LOGS_FOLLOW_INTERVAL_SECONDS = 1.0
 
 @router.get("/logs", response_model=List[str])
 async def get_logs(
+    limit: int = Query(LOGS_PAGE_SIZE, ge=1, le=LOGS_MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, ge=0),
     current_user: models.User = Depends(get_current_user)
 ):
-    log_path = "log.txt"
-    
-    if not os.path.exists(log_path):
+    if not os.path.exists(LOG_FILE):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Log file not found"
         )
     
     try:
-        with open(log_path, "r") as log_file:
-            logs = log_file.readlines()[::-1]
-        cleaned_logs = [line.strip() for line in logs if line.strip()]
-        return cleaned_logs
+        lines, next_cursor = await run_in_threadpool(read_log_tail, LOG_FILE, limit, cursor)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error reading log file: {str(e)}"
         )
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+    return FastJSONResponse(content=lines, headers=headers)
+
+@router.get("/logs/follow")
+async def follow_logs(
+    request: Request,
+    cursor: Optional[int] = Query(None, ge=0),
+    current_user: models.User = Depends(get_current_user)
+):
+    if not os.path.exists(LOG_FILE):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Log file not found"
+        )
+
+    async def event_stream():
+        offset = cursor if cursor is not None else os.path.getsize(LOG_FILE)
+        while not await request.is_disconnected():
+            try:
+                lines, offset = await run_in_threadpool(read_log_from, LOG_FILE, offset)
+            except FileNotFoundError:
+                lines, offset = [], 0
+            for line in lines:
+                yield sse_event("log", {"line": line, "cursor": offset})
+            await asyncio.sleep(LOGS_FOLLOW_INTERVAL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
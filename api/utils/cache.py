@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Hashable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from api import models
+import config
+from api.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 256, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class PredictionCache:
+    def __init__(self, maxsize: int, ttl: float, db_ttl: float, purge_interval: float = 3600):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.db_ttl = db_ttl
+        self.purge_interval = purge_interval
+        self.db_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.purged = 0
+        self._next_purge = 0.0
+
+    @staticmethod
+    def key_for(df: pd.DataFrame, prompt_version: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(prompt_version.encode())
+        digest.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    async def get(self, db: AsyncSession, key: str) -> Optional[str]:
+        prediction = self.memory.get(key)
+        if prediction is not None:
+            return prediction
+
+        result = await db.execute(
+            select(models.PredictionCache.prediction).where(
+                models.PredictionCache.key == key,
+                models.PredictionCache.created_at >= datetime.utcnow() - timedelta(seconds=self.db_ttl),
+            )
+        )
+        prediction = result.scalar_one_or_none()
+        if prediction is None:
+            self.misses += 1
+            return None
+        self.db_hits += 1
+        self.memory.set(key, prediction)
+        return prediction
+
+    async def set(self, db: AsyncSession, key: str, prediction: str):
+        # part of the caller's transaction, committed alongside the RecentImport row; an upsert so
+        # two identical uploads racing past get() both succeed instead of one hitting the primary key
+        self.memory.set(key, prediction)
+        insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(models.PredictionCache).values(key=key, prediction=prediction, created_at=datetime.utcnow())
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.PredictionCache.key],
+            set_={"prediction": stmt.excluded.prediction, "created_at": stmt.excluded.created_at},
+        ))
+        await self.purge_expired(db)
+
+    async def purge_expired(self, db: AsyncSession):
+        # expired rows are never read again; at most once per purge_interval per process, a range
+        # delete on the created_at index removes them so the table does not grow without bound
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        result = await db.execute(
+            delete(models.PredictionCache).where(
+                models.PredictionCache.created_at < datetime.utcnow() - timedelta(seconds=self.db_ttl)
+            )
+        )
+        self.purged += result.rowcount or 0
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "purged": self.purged,
+        }
+
+
+class UserCache:
+    def __init__(self, maxsize: int, ttl: float, enabled: bool = True):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.enabled = enabled
+        self.invalidations = 0
+        self._columns = [attr.key for attr in models.User.__mapper__.column_attrs]
+
+    async def get(self, db: AsyncSession, userid: int) -> Optional[models.User]:
+        if self.enabled:
+            fields = self.cache.get(userid)
+            if fields is not None:
+                # rebuilt as a persistent instance so routes can still modify and commit it
+                user = models.User(**fields)
+                make_transient_to_detached(user)
+                db.add(user)
+                return user
+
+        result = await db.execute(
+            select(models.User).where(models.User.userid == userid)
+        )
+        user = result.scalars().first()
+        if user is not None and self.enabled:
+            self.set(user)
+        return user
+
+    def set(self, user: models.User):
+        self.cache.set(user.userid, {key: getattr(user, key) for key in self._columns})
+
+    def invalidate(self, userid: int):
+        self.invalidations += 1
+        self.cache.pop(userid)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "enabled": self.enabled, "invalidations": self.invalidations}
+
+
+user_cache = UserCache(
+    maxsize=getattr(config, "USER_CACHE_SIZE", 1024),
+    ttl=getattr(config, "USER_CACHE_TTL_SECONDS", 60),
+    enabled=getattr(config, "USER_CACHE_ENABLED", True),
+)
+
+prediction_cache = PredictionCache(
+    maxsize=getattr(config, "PREDICTION_CACHE_SIZE", 256),
+    ttl=getattr(config, "PREDICTION_CACHE_TTL_SECONDS", 3600),
+    db_ttl=getattr(config, "PREDICTION_CACHE_DB_TTL_SECONDS", 7 * 24 * 3600),
+    purge_interval=getattr(config, "PREDICTION_CACHE_PURGE_INTERVAL_SECONDS", 3600),
+)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from typing import List, Optional
+
+from api.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# layout (zlib-compressed after the magic):
+#   uint32 rows, uint16 columns
+#   per column: uint16 name length, utf-8 name, packed null bitmap, float32 values (nulls stored as 0)
+MAGIC = b"TC1"
+DECIMALS = 4
+
+
+def encode_chart(df: pd.DataFrame) -> bytes:
+    rows = len(df)
+    parts = [struct.pack("<IH", rows, len(df.columns))]
+    for column in df.columns:
+        values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float32)
+        mask = ~np.isfinite(values)
+        name = str(column).encode()
+        parts.append(struct.pack("<H", len(name)))
+        parts.append(name)
+        parts.append(np.packbits(mask).tobytes())
+        parts.append(np.where(mask, np.float32(0), values).astype("<f4").tobytes())
+    return MAGIC + zlib.compress(b"".join(parts), 6)
+
+
+def encode_records(records: List[dict]) -> bytes:
+    return encode_chart(pd.DataFrame.from_records(records))
+
+
+def decode_chart_columns(blob: bytes) -> dict:
+    if not blob.startswith(MAGIC):
+        raise ValueError("Unknown chart encoding")
+    payload = memoryview(zlib.decompress(blob[len(MAGIC):]))
+    rows, n_columns = struct.unpack_from("<IH", payload, 0)
+    offset = 6
+    mask_size = (rows + 7) // 8
+    columns = {}
+    for _ in range(n_columns):
+        (name_length,) = struct.unpack_from("<H", payload, offset)
+        offset += 2
+        name = bytes(payload[offset:offset + name_length]).decode()
+        offset += name_length
+        mask = np.unpackbits(np.frombuffer(payload, dtype=np.uint8, count=mask_size, offset=offset), count=rows).astype(bool)
+        offset += mask_size
+        values = np.frombuffer(payload, dtype="<f4", count=rows, offset=offset)
+        offset += rows * 4
+        columns[name] = (np.round(values.astype(np.float64), DECIMALS), mask)
+    return columns
+
+
+def decode_chart(blob: bytes) -> List[dict]:
+    columns = decode_chart_columns(blob)
+    lists = {}
+    for name, (values, mask) in columns.items():
+        column = values.tolist()
+        for i in np.flatnonzero(mask).tolist():
+            column[i] = None
+        lists[name] = column
+    names = list(lists)
+    return [dict(zip(names, row)) for row in zip(*lists.values())]
+
+
+def decode_chart_frame(blob: bytes) -> pd.DataFrame:
+    return pd.DataFrame({
+        name: np.where(mask, np.nan, values)
+        for name, (values, mask) in decode_chart_columns(blob).items()
+    })
+
+
+def load_chart_frame(chart_blob: Optional[bytes], chart_data: Optional[str]) -> pd.DataFrame:
+    if chart_blob:
+        return decode_chart_frame(chart_blob)
+    return pd.DataFrame.from_records(json.loads(chart_data) if chart_data else [])
+
+
+def load_chart_data(chart_blob: Optional[bytes], chart_data: Optional[str]) -> List[dict]:
+    if chart_blob:
+        return decode_chart(chart_blob)
+    if chart_data:
+        # NaN parsed from legacy rows is written as null by the response encoder
+        return json.loads(chart_data)
+    return []
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+import config
+from api.utils.cache import TTLCache
+from api.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+CHART_CACHE_SIZE = getattr(config, "CHART_CACHE_SIZE", 512)
+CHART_CACHE_TTL_SECONDS = getattr(config, "CHART_CACHE_TTL_SECONDS", 24 * 3600)
+MIN_POINTS = 3
+
+
+def lttb_indices(x: np.ndarray, ys: np.ndarray, max_points: int) -> np.ndarray:
+    n = len(x)
+    if max_points >= n or max_points < MIN_POINTS:
+        return np.arange(n)
+
+    # Largest-Triangle-Three-Buckets, scoring every point of a bucket at once; with several
+    # y series the triangle areas are summed so peaks in any series are kept
+    ys = np.nan_to_num(np.atleast_2d(ys).astype(np.float64))
+    x = np.nan_to_num(x.astype(np.float64))
+    every = (n - 2) / (max_points - 2)
+    bounds = (np.floor(np.arange(max_points - 1) * every) + 1).astype(np.int64)
+    bounds[-1] = n - 1
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        next_start = end if end < next_end else n - 1
+        avg_x = x[next_start:next_end].mean()
+        avg_y = ys[:, next_start:next_end].mean(axis=1, keepdims=True)
+        area = np.abs(
+            (x[a] - avg_x) * (ys[:, start:end] - ys[:, a:a + 1])
+            - (x[a] - x[start:end]) * (avg_y - ys[:, a:a + 1])
+        ).sum(axis=0)
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_frame(df: pd.DataFrame, max_points: Optional[int], x_column: str = "days_elapsed") -> pd.DataFrame:
+    if not max_points or len(df) <= max_points:
+        return df
+    y_columns = [column for column in df.columns if column != x_column]
+    indices = lttb_indices(df[x_column].to_numpy(), df[y_columns].to_numpy().T, max_points)
+    return df.iloc[indices]
+
+
+def downsample_records(records: List[dict], max_points: Optional[int]) -> List[dict]:
+    if not max_points or len(records) <= max_points:
+        return records
+    return downsample_frame(pd.DataFrame.from_records(records), max_points).to_dict(orient="records")
+
+
+chart_cache = TTLCache(maxsize=CHART_CACHE_SIZE, ttl=CHART_CACHE_TTL_SECONDS)
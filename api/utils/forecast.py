@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import List, Optional
+
+import config
+from api.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+BOOTSTRAP_SAMPLES = getattr(config, "FORECAST_BOOTSTRAP_SAMPLES", 500)
+BOOTSTRAP_MAX_GROUPS = getattr(config, "FORECAST_BOOTSTRAP_MAX_GROUPS", 1000)
+CONFIDENCE = 0.95
+
+
+def _round(value, digits: int = 2) -> Optional[float]:
+    if value is None or not np.isfinite(value):
+        return None
+    return round(float(value), digits)
+
+
+def _bootstrap_rates(
+    xy: np.ndarray, xx: np.ndarray, rng: np.random.Generator, samples: int, max_groups: int = BOOTSTRAP_MAX_GROUPS
+) -> np.ndarray:
+    # progress is modelled as rate * days_elapsed (0% at day 0), so each resample only needs the sums of
+    # x*y and x*x. Long histories are folded into at most max_groups strided groups first and the group
+    # sums are resampled: the variance of the total is the same, but memory is samples x groups, not x rows
+    if len(xy) > max_groups:
+        groups = np.arange(len(xy)) % max_groups
+        xy = np.bincount(groups, weights=xy, minlength=max_groups)
+        xx = np.bincount(groups, weights=xx, minlength=max_groups)
+    idx = rng.integers(0, len(xy), size=(samples, len(xy)))
+    return xy[idx].sum(axis=1) / xx[idx].sum(axis=1)
+
+
+def forecast_projects(df: pd.DataFrame, samples: int = BOOTSTRAP_SAMPLES, seed: int = 0) -> List[dict]:
+    frame = df.copy()
+    if "project_id" not in frame.columns:
+        frame["project_id"] = 0
+    frame = frame.dropna(subset=["days_elapsed", "days_remaining", "actual_progress"])
+    frame = frame[frame["days_elapsed"] > 0]
+    if frame.empty:
+        return []
+
+    frame = frame.sort_values(["project_id", "days_elapsed"], kind="stable")
+    x = frame["days_elapsed"].to_numpy(dtype=np.float64)
+    y = frame["actual_progress"].to_numpy(dtype=np.float64)
+    xy = x * y
+    xx = x * x
+    frame["_xy"] = xy
+    frame["_xx"] = xx
+
+    grouped = frame.groupby("project_id", sort=True)
+    sums = grouped[["_xy", "_xx"]].sum()
+    latest = grouped.tail(1).set_index("project_id")
+    rate = (sums["_xy"] / sums["_xx"]).to_numpy()
+
+    actual = latest["actual_progress"].to_numpy(dtype=np.float64)
+    elapsed = latest["days_elapsed"].to_numpy(dtype=np.float64)
+    planned_total = elapsed + latest["days_remaining"].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        planned = elapsed / planned_total * 100
+    if "planned_progress" in latest.columns:
+        # a blank planned_progress on the latest day falls back to the schedule implied by the day counts
+        given = latest["planned_progress"].to_numpy(dtype=np.float64)
+        planned = np.where(np.isnan(given), planned, given)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        estimated_total = np.where(rate > 0, 100.0 / rate, np.inf)
+    estimated_remaining = np.maximum(estimated_total - elapsed, 0.0)
+
+    rng = np.random.default_rng(seed)
+    tail = (1 - CONFIDENCE) / 2
+    positions = grouped.indices
+    today = date.today()
+    results = []
+    for i, project_id in enumerate(sums.index):
+        rows = positions[project_id]
+        boot = _bootstrap_rates(xy[rows], xx[rows], rng, samples)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            boot_remaining = np.maximum(np.where(boot > 0, 100.0 / boot, np.inf) - elapsed[i], 0.0)
+        # resamples without measurable progress never finish (inf); picking order statistics instead of
+        # interpolating keeps them as an open upper bound rather than NaN
+        low, high = np.quantile(boot_remaining, [tail, 1 - tail], method="higher")
+        completion = None
+        if np.isfinite(estimated_remaining[i]):
+            completion = (today + timedelta(days=int(np.ceil(estimated_remaining[i])))).isoformat()
+
+        results.append({
+            "project_id": project_id.item() if hasattr(project_id, "item") else project_id,
+            "actual_progress": _round(actual[i]),
+            "planned_progress": _round(planned[i]),
+            "deviation": _round(actual[i] - planned[i]),
+            "rate_per_day": _round(rate[i], 4),
+            "days_elapsed": _round(elapsed[i]),
+            "planned_total_days": _round(planned_total[i]),
+            "estimated_total_days": _round(estimated_total[i]),
+            "estimated_days_remaining": _round(estimated_remaining[i]),
+            "estimated_days_remaining_ci": [_round(low), _round(high)],
+            "estimated_delay_days": _round(estimated_total[i] - planned_total[i]),
+            "estimated_completion_date": completion,
+            "samples": int(len(rows)),
+        })
+    return results
+
+
+def summarize_forecast(forecast: List[dict]) -> str:
+    if not forecast:
+        return "- Not enough progress data to estimate completion."
+
+    lines = []
+    for item in forecast:
+        line = f"- Project {item['project_id']}: {item['actual_progress']}% complete"
+        if item["deviation"] is None:
+            line += ", no planned progress to compare against"
+        else:
+            line += f" vs {item['planned_progress']}% planned ({item['deviation']:+} pts)"
+        if item["estimated_days_remaining"] is None:
+            line += "; no measurable progress yet, completion cannot be estimated."
+        else:
+            low, high = item["estimated_days_remaining_ci"]
+            if low is None:
+                interval = "unbounded"
+            elif high is None:
+                interval = f"at least {low}"
+            else:
+                interval = f"{low}-{high}"
+            delay = item["estimated_delay_days"]
+            line += (
+                f"; about {item['estimated_days_remaining']} days remaining "
+                f"({int(CONFIDENCE * 100)}% CI {interval}), finishing around {item['estimated_completion_date']}"
+            )
+            if delay is None:
+                line += "."
+            else:
+                status = "behind schedule" if delay > 0 else "ahead of schedule"
+                line += f", {abs(delay)} days {status}."
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from api import auth
+from api.utils.metrics import password_hash_duration
+import config
+
+
+class PasswordHasher:
+    def __init__(self, executor_kind: str = "thread", workers: int = 4, max_queue: int = 64, rehash_on_login: bool = True):
+        self.executor_kind = executor_kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rehash_on_login = rehash_on_login
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, op: str, func, *args):
+        if self._pending >= self.max_queue:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service busy, try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+            password_hash_duration.observe(time.perf_counter() - start, op=op)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", auth.get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", auth.verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        if not self.rehash_on_login:
+            return await self.verify(plain_password, hashed_password), None
+        return await self._run("verify", auth.verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor_kind=getattr(config, "PASSWORD_HASH_EXECUTOR", "thread"),
+    workers=getattr(config, "PASSWORD_HASH_WORKERS", 4),
+    max_queue=getattr(config, "PASSWORD_HASH_MAX_QUEUE", 64),
+    rehash_on_login=getattr(config, "PASSWORD_REHASH_ON_LOGIN", True),
+)
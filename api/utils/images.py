@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+import config
+from api.utils.lazy import lazy_import
+
+Image = lazy_import("PIL.Image")
+ImageOps = lazy_import("PIL.ImageOps")
+
+AVATAR_SIZES = tuple(sorted(getattr(config, "AVATAR_SIZES", (200, 96, 48)), reverse=True))
+AVATAR_QUALITY = 70
+IMAGE_MAX_BYTES = getattr(config, "IMAGE_MAX_BYTES", 20 * 1024 * 1024)
+IMAGE_MAX_PIXELS = getattr(config, "IMAGE_MAX_PIXELS", 60_000_000)
+IMAGE_WORKERS = getattr(config, "IMAGE_WORKERS", 2)
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+@dataclass
+class AvatarVariant:
+    size: int
+    data: bytes
+    digest: str
+
+
+def _encode_jpeg(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=AVATAR_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def process_avatar(data: bytes, sizes=AVATAR_SIZES, max_pixels: int = IMAGE_MAX_PIXELS) -> List[AvatarVariant]:
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        # Pillow's own pixel guard fired before ours; this is still an oversized upload, not a corrupt one
+        raise ImageTooLarge(str(e))
+    except Exception:
+        raise ValueError("Unable to open image.")
+
+    # Image.open only parses the header, so oversize images are rejected before any pixels are decoded
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageTooLarge(f"Image is {width}x{height}; the limit is {max_pixels} pixels.")
+
+    largest = sizes[0]
+    if image.format == "JPEG":
+        # let libjpeg decode at 1/2, 1/4 or 1/8 scale while staying >= the largest avatar
+        image.draft("RGB", (largest, largest))
+
+    try:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((largest, largest))
+    except Exception:
+        raise ValueError("Unable to open image.")
+
+    variants = []
+    for size in sizes:
+        # each smaller size is derived from the previous one instead of the original
+        image.thumbnail((size, size))
+        encoded = _encode_jpeg(image)
+        variants.append(AvatarVariant(size=size, data=encoded, digest=hashlib.sha256(encoded).hexdigest()[:16]))
+    return variants
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+async def process_avatar_async(data: bytes) -> List[AvatarVariant]:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, process_avatar, data)
+
+
+def shutdown_image_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
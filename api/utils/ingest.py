@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+import csv
+import importlib.util
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException, UploadFile, status
+
+from api.utils.metrics import csv_parse_duration, csv_upload_bytes, csv_upload_rows
+from api.utils.utils import normalize_column_name
+import config
+from api.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pa_csv = lazy_import("pyarrow.csv")
+pa_ipc = lazy_import("pyarrow.ipc")
+pa_parquet = lazy_import("pyarrow.parquet")
+
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+UPLOAD_MAX_BYTES = getattr(config, "UPLOAD_MAX_BYTES", 50 * 1024 * 1024)
+UPLOAD_MAX_ROWS = getattr(config, "UPLOAD_MAX_ROWS", 1_000_000)
+CSV_CHUNK_ROWS = getattr(config, "CSV_CHUNK_ROWS", 50_000)
+CSV_ENGINE = getattr(config, "CSV_ENGINE", "pyarrow" if ARROW_AVAILABLE else "c")
+UPLOAD_VALIDATION_MAX_ERRORS = getattr(config, "UPLOAD_VALIDATION_MAX_ERRORS", 100)
+PREVIEW_ROWS = 5
+FLOAT32_DIGITS = 7
+
+PARQUET_MAGIC = b"PAR1"
+ARROW_FILE_MAGIC = b"ARROW1"
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    dtype: str
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+
+# every column the app understands, keyed by normalized name; anything else in an upload is never parsed
+UPLOAD_SCHEMA: Dict[str, ColumnSpec] = {
+    "project_id": ColumnSpec("int32"),
+    "days_elapsed": ColumnSpec("int32", low=0),
+    "days_remaining": ColumnSpec("int32", low=0),
+    "progress_percent": ColumnSpec("float32", low=0, high=100),
+    "planned_progress": ColumnSpec("float32", low=0, high=100),
+    "actual_progress": ColumnSpec("float32", low=0, high=100),
+    "materials_used": ColumnSpec("float32", low=0),
+    "workforce": ColumnSpec("float32", low=0),
+}
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class _LimitedReader:
+    def __init__(self, raw, max_bytes: int):
+        self.raw = raw
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def read(self, size: int = -1):
+        data = self.raw.read(size)
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise UploadTooLarge()
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        self.bytes_read = self.raw.seek(offset, whence)
+        return self.bytes_read
+
+    # the file protocol pyarrow.PythonFile checks for
+    @property
+    def closed(self) -> bool:
+        return self.raw.closed
+
+    def readable(self) -> bool:
+        return True
+
+    def __iter__(self):
+        return iter(self.raw)
+
+
+@dataclass
+class IngestResult:
+    columns: List[str]
+    rows: int
+    bytes_read: int
+    preview: List[dict]
+    validation: dict = field(default_factory=dict)
+    format: str = "csv"
+    frame: Optional[pd.DataFrame] = field(default=None, repr=False)
+
+
+def _too_large(detail: str):
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+def _bad_upload(detail: str):
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def detect_format(raw) -> str:
+    head = raw.read(len(ARROW_FILE_MAGIC))
+    raw.seek(0)
+    if head.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if head.startswith(ARROW_FILE_MAGIC) or head.startswith(ARROW_STREAM_MAGIC):
+        return "arrow"
+    return "csv"
+
+
+def select_columns(names) -> Dict[str, str]:
+    # upload column name -> schema name; the first column that normalizes to a schema name wins
+    selected: Dict[str, str] = {}
+    for name in names:
+        canonical = normalize_column_name(name)
+        if canonical in UPLOAD_SCHEMA and canonical not in selected.values():
+            selected[name] = canonical
+    return selected
+
+
+def _round_significant(values: np.ndarray, digits: int = FLOAT32_DIGITS) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    exponent = digits - 1 - np.where(np.isfinite(magnitude), magnitude, 0)
+    # scaling by an exact power of ten in the right direction keeps the division correctly rounded
+    up = np.power(10.0, np.maximum(exponent, 0))
+    down = np.power(10.0, np.maximum(-exponent, 0))
+    return np.round(values * up / down) * down / up
+
+
+def as_float64(df: pd.DataFrame) -> pd.DataFrame:
+    # float32 carries about 7 significant digits; rounding to them while widening emits 45.3 as 45.3
+    # and not 45.29999923706055
+    columns = df.select_dtypes("float32").columns
+    if len(columns) == 0:
+        return df
+    return df.assign(**{column: _round_significant(df[column].to_numpy(dtype=np.float64)) for column in columns})
+
+
+def validate_frame(df: pd.DataFrame, max_errors: int = UPLOAD_VALIDATION_MAX_ERRORS, offset: int = 0):
+    # checks whole columns at once and casts them to the schema dtypes; rows with a bad value are dropped.
+    # offset is the number of upload rows before this chunk, so reported row numbers are upload-wide
+    rows = len(df)
+    invalid = np.zeros(rows, dtype=bool)
+    problems = []
+    typed = {}
+    for column in df.columns:
+        spec = UPLOAD_SCHEMA[column]
+        raw = df[column]
+        checks = []
+        if raw.dtype == spec.dtype:
+            # the typed parse already guarantees every value is present and of the right type
+            values = raw.to_numpy()
+        else:
+            values = pd.to_numeric(raw, errors="coerce").astype(np.float64).to_numpy()
+            present = raw.notna().to_numpy()
+            checks.append(("not a number", present & np.isnan(values)))
+            if spec.dtype.startswith("int"):
+                checks.append(("missing", ~present))
+                checks.append(("not an integer", np.isfinite(values) & (np.mod(values, 1) != 0)))
+        with np.errstate(invalid="ignore"):
+            if spec.low is not None:
+                checks.append(("out of range", values < spec.low))
+            if spec.high is not None:
+                checks.append(("out of range", values > spec.high))
+        for reason, mask in checks:
+            if mask.any():
+                invalid |= mask
+                problems.append((column, reason, mask))
+        typed[column] = values
+
+    errors = []
+    counts: Dict[str, Dict[str, int]] = {}
+    for column, reason, mask in problems:
+        positions = np.flatnonzero(mask)
+        column_counts = counts.setdefault(column, {})
+        column_counts[reason] = column_counts.get(reason, 0) + len(positions)
+        errors.extend({"row": offset + int(position) + 1, "column": column, "error": reason} for position in positions[:max_errors])
+    errors.sort(key=lambda error: error["row"])
+
+    keep = ~invalid
+    frame = pd.DataFrame({
+        column: (values[keep] if problems else values).astype(UPLOAD_SCHEMA[column].dtype, copy=False)
+        for column, values in typed.items()
+    }, columns=list(df.columns))
+    report = {
+        "rows": rows,
+        "valid_rows": int(keep.sum()),
+        "invalid_rows": int(invalid.sum()),
+        "error_counts": counts,
+        "errors": errors[:max_errors],
+    }
+    return frame, report
+
+
+def _merge_report(total: dict, report: dict, max_errors: int):
+    for key in ("rows", "valid_rows", "invalid_rows"):
+        total[key] += report[key]
+    for column, counts in report["error_counts"].items():
+        column_counts = total["error_counts"].setdefault(column, {})
+        for reason, count in counts.items():
+            column_counts[reason] = column_counts.get(reason, 0) + count
+    total["errors"].extend(report["errors"][:max_errors - len(total["errors"])])
+
+
+def _rebatch(batches, chunksize: int) -> Iterator[pd.DataFrame]:
+    # Arrow readers produce batches sized by bytes or row groups; regroup them into chunks of about chunksize rows
+    pending = []
+    rows = 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= chunksize:
+            yield pa.Table.from_batches(pending).to_pandas()
+            pending = []
+            rows = 0
+    if pending:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+class UploadIngest:
+    # parses an upload in chunks of about `chunksize` rows: chunks() yields typed, validated frames, so callers
+    # that do not need the whole upload at once (e.g. /import-csv) hold one chunk at a time
+    def __init__(
+        self,
+        file: UploadFile,
+        header_check: Optional[Callable[[List[str]], None]] = None,
+        max_bytes: int = UPLOAD_MAX_BYTES,
+        max_rows: int = UPLOAD_MAX_ROWS,
+        chunksize: int = CSV_CHUNK_ROWS,
+        max_errors: int = UPLOAD_VALIDATION_MAX_ERRORS,
+    ):
+        if file.size is not None and file.size > max_bytes:
+            raise _too_large(f"Upload exceeds the {max_bytes} byte limit.")
+        self.file = file
+        self.header_check = header_check
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.chunksize = chunksize
+        self.max_errors = max_errors
+        self.reader = _LimitedReader(file.file, max_bytes)
+        self.format = detect_format(file.file)
+        self.columns: List[str] = []
+        self.preview: List[dict] = []
+        self.validation = {"rows": 0, "valid_rows": 0, "invalid_rows": 0, "error_counts": {}, "errors": []}
+        self.parse_seconds = 0.0
+
+    def chunks(self) -> Iterator[pd.DataFrame]:
+        frames = self._csv_frames() if self.format == "csv" else self._arrow_frames()
+        while True:
+            start = time.perf_counter()
+            try:
+                frame = next(frames, None)
+            except UploadTooLarge:
+                raise _too_large(f"Upload exceeds the {self.max_bytes} byte limit.")
+            if frame is None:
+                break
+            frame = self._accept(frame)
+            self.parse_seconds += time.perf_counter() - start
+            if len(frame):
+                yield frame
+
+        validation = self.validation
+        if validation["rows"] and not validation["valid_rows"]:
+            first = validation["errors"][0]
+            raise _bad_upload(f"No valid rows in upload; row {first['row']}: {first['column']} is {first['error']}.")
+        csv_parse_duration.observe(self.parse_seconds)
+        csv_upload_bytes.observe(self.reader.bytes_read)
+        csv_upload_rows.observe(validation["rows"])
+
+    def empty_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({column: np.array([], dtype=UPLOAD_SCHEMA[column].dtype) for column in self.columns})
+
+    def result(self, frame: Optional[pd.DataFrame] = None) -> IngestResult:
+        return IngestResult(
+            columns=self.columns,
+            rows=self.validation["rows"],
+            bytes_read=self.reader.bytes_read,
+            preview=self.preview,
+            validation=self.validation,
+            format=self.format,
+            frame=frame,
+        )
+
+    def _accept(self, frame: pd.DataFrame) -> pd.DataFrame:
+        offset = self.validation["rows"]
+        if offset + len(frame) > self.max_rows:
+            raise _too_large(f"Upload exceeds the {self.max_rows} row limit.")
+        frame, report = validate_frame(frame, self.max_errors, offset=offset)
+        _merge_report(self.validation, report, self.max_errors)
+        if len(self.preview) < PREVIEW_ROWS:
+            head = as_float64(frame.head(PREVIEW_ROWS - len(self.preview)))
+            self.preview.extend(head.astype(object).where(head.notna(), None).to_dict(orient="records"))
+        return frame
+
+    def _select(self, names) -> Dict[str, str]:
+        selected = select_columns(names)
+        if self.header_check is not None:
+            self.header_check(list(selected.values()))
+        self.columns = list(selected.values())
+        return selected
+
+    def _csv_frames(self) -> Iterator[pd.DataFrame]:
+        line = self.reader.raw.readline(self.max_bytes)
+        self.reader.seek(0)
+        header = next(csv.reader([line.decode("utf-8-sig", errors="replace")]), [])
+        if not header:
+            raise _bad_upload("CSV file is empty.")
+        selected = self._select(header)
+
+        read = self._arrow_csv if CSV_ENGINE == "pyarrow" and ARROW_AVAILABLE else self._pandas_csv
+        emitted = 0
+        # typed parse first; a blank or malformed cell makes it fail at that chunk, and only then is the
+        # upload re-read as text, skipping the rows already emitted, so validate_frame can point at the bad rows
+        for as_text in (False, True):
+            self.reader.seek(0)
+            seen = 0
+            try:
+                for frame in read(selected, as_text):
+                    start = seen
+                    seen += len(frame)
+                    if seen > emitted:
+                        yield frame.iloc[max(emitted - start, 0):].rename(columns=selected)
+                        emitted = seen
+                return
+            except ValueError as e:
+                # pandas' ParserError and pyarrow's ArrowInvalid are both ValueErrors
+                if as_text:
+                    raise _bad_upload(f"Unable to parse CSV: {str(e)}")
+
+    def _arrow_csv(self, selected: Dict[str, str], as_text: bool) -> Iterator[pd.DataFrame]:
+        column_types = {
+            name: pa.string() if as_text else getattr(pa, UPLOAD_SCHEMA[canonical].dtype)()
+            for name, canonical in selected.items()
+        }
+        stream = pa_csv.open_csv(
+            pa.PythonFile(self.reader, mode="r"),
+            read_options=pa_csv.ReadOptions(use_threads=True),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=list(selected),
+                column_types=column_types,
+                strings_can_be_null=True,
+            ),
+        )
+        yield from _rebatch(stream, self.chunksize)
+
+    def _pandas_csv(self, selected: Dict[str, str], as_text: bool) -> Iterator[pd.DataFrame]:
+        dtype = {name: str if as_text else UPLOAD_SCHEMA[canonical].dtype for name, canonical in selected.items()}
+        with pd.read_csv(self.reader, usecols=list(selected), dtype=dtype, chunksize=self.chunksize) as chunks:
+            yield from chunks
+
+    def _arrow_frames(self) -> Iterator[pd.DataFrame]:
+        if not ARROW_AVAILABLE:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Parquet and Arrow uploads are not supported on this server; upload a CSV instead.",
+            )
+        raw = self.file.file
+        size = raw.seek(0, 2)
+        raw.seek(0)
+        if size > self.max_bytes:
+            raise _too_large(f"Upload exceeds the {self.max_bytes} byte limit.")
+        self.reader.bytes_read = size
+        is_ipc_file = raw.read(len(ARROW_FILE_MAGIC)) == ARROW_FILE_MAGIC
+        raw.seek(0)
+        # read straight from the spooled upload; Parquet row groups and IPC batches are decoded one at a time
+        source = pa.PythonFile(raw, mode="r")
+        try:
+            if self.format == "parquet":
+                parquet = pa_parquet.ParquetFile(source)
+                selected = self._select(parquet.schema_arrow.names)
+                if parquet.metadata.num_rows > self.max_rows:
+                    raise _too_large(f"Upload exceeds the {self.max_rows} row limit.")
+                batches = parquet.iter_batches(batch_size=self.chunksize, columns=list(selected))
+            elif is_ipc_file:
+                ipc = pa_ipc.open_file(source)
+                selected = self._select(ipc.schema.names)
+                batches = (ipc.get_batch(i).select(list(selected)) for i in range(ipc.num_record_batches))
+            else:
+                ipc = pa_ipc.open_stream(source)
+                selected = self._select(ipc.schema.names)
+                batches = (batch.select(list(selected)) for batch in ipc)
+            for frame in _rebatch(batches, self.chunksize):
+                yield frame.rename(columns=selected)
+        except pa.ArrowException as e:
+            raise _bad_upload(f"Unable to read {self.format} upload: {str(e)}")
+
+
+def ingest_csv(
+    file: UploadFile,
+    header_check: Optional[Callable[[List[str]], None]] = None,
+    keep_frame: bool = False,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    max_rows: int = UPLOAD_MAX_ROWS,
+    chunksize: int = CSV_CHUNK_ROWS,
+) -> IngestResult:
+    upload = UploadIngest(file, header_check, max_bytes=max_bytes, max_rows=max_rows, chunksize=chunksize)
+    frames = []
+    for chunk in upload.chunks():
+        if keep_frame:
+            frames.append(chunk)
+    frame = None
+    if keep_frame:
+        frame = pd.concat(frames, ignore_index=True) if frames else upload.empty_frame()
+    return upload.result(frame)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+import config
+
+JOB_WORKERS = getattr(config, "JOB_WORKERS", 4)
+JOB_QUEUE_SIZE = getattr(config, "JOB_QUEUE_SIZE", 100)
+JOB_RESULT_TTL_SECONDS = getattr(config, "JOB_RESULT_TTL_SECONDS", 3600)
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    kind: str
+    owner_id: int
+    payload: Dict[str, Any] = field(repr=False)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue(ABC):
+    # a shared backend (e.g. Redis lists + hashes) implements these same calls; payloads must then be serialisable
+    @abstractmethod
+    async def start(self, handlers: Dict[str, JobHandler]):
+        ...
+
+    @abstractmethod
+    async def stop(self):
+        ...
+
+    @abstractmethod
+    async def submit(self, kind: str, owner_id: int, payload: Dict[str, Any]) -> Job:
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class InMemoryJobQueue(JobQueue):
+    def __init__(self, workers: int = JOB_WORKERS, maxsize: int = JOB_QUEUE_SIZE, result_ttl: float = JOB_RESULT_TTL_SECONDS):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.result_ttl = result_ttl
+        self.jobs: Dict[str, Job] = {}
+        self.handlers: Dict[str, JobHandler] = {}
+        self.rejected = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, handlers: Dict[str, JobHandler]):
+        self.handlers = handlers
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, owner_id: int, payload: Dict[str, Any]) -> Job:
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self._prune()
+        job = Job(kind=kind, owner_id=owner_id, payload=payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull()
+        self.jobs[job.id] = job
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def stats(self) -> dict:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "maxsize": self.maxsize,
+            "workers": self.workers,
+            "rejected": self.rejected,
+            "jobs": counts,
+        }
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await self.handlers[job.kind](job.payload)
+                job.status = "succeeded"
+            except Exception as e:
+                logger.exception("Job %s (%s) failed", job.id, job.kind)
+                job.status = "failed"
+                job.error = e.detail if isinstance(e, HTTPException) else str(e)
+            finally:
+                # the payload can hold a whole DataFrame; drop it once the job is done
+                job.payload = {}
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+
+def queue_full_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Forecast queue is full, try again shortly.",
+        headers={"Retry-After": "5"},
+    )
+
+
+job_queue = InMemoryJobQueue()
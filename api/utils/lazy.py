@@ -0,0 +1,33 @@
+import importlib
+import time
+from typing import Dict
+
+
+class LazyModule:
+    # stands in for a module until an attribute is first read; import_module is thread-safe,
+    # so concurrent first uses from the threadpool and the event loop are fine
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def preload(*names: str) -> Dict[str, float]:
+    timings = {}
+    for name in names:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+
+from api.utils.metrics import llm_request_duration, record_llm_usage
+from api.utils.utils import create_model
+import config
+
+LLM_MAX_CONCURRENCY = getattr(config, "LLM_MAX_CONCURRENCY", 4)
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    def __init__(self, model_factory, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.model_factory = model_factory
+        self.model = None
+        self._lock = threading.Lock()
+        # shared by every caller (requests, streams and background jobs) so Gemini load stays bounded
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    def require_model(self):
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    try:
+                        self.model = self.model_factory()
+                    except Exception:
+                        logger.exception("Unable to initialize the AI model")
+                        raise HTTPException(status_code=500, detail="AI model not initialized.")
+        return self.model
+
+    async def generate(self, prompt) -> str:
+        model = self.require_model()
+        async with self.semaphore:
+            start = time.perf_counter()
+            response = await model.generate_content_async(prompt)
+            llm_request_duration.observe(time.perf_counter() - start, kind="generate")
+        record_llm_usage(response, "generate")
+        return response.text
+
+    async def stream(self, prompt) -> AsyncIterator[str]:
+        model = self.require_model()
+        async with self.semaphore:
+            start = time.perf_counter()
+            first_token = True
+            response = await model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if first_token:
+                    llm_request_duration.observe(time.perf_counter() - start, kind="stream_first_token")
+                    first_token = False
+                # safety-blocked or empty chunks raise on .text
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue
+                if text:
+                    yield text
+            llm_request_duration.observe(time.perf_counter() - start, kind="stream")
+            # usage metadata is reported on the final chunk
+            record_llm_usage(response, "stream")
+
+
+llm_client = LLMClient(create_model)
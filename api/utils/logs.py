@@ -0,0 +1,93 @@
+import logging
+import logging.handlers
+import os
+import queue
+from typing import List, Optional, Tuple
+
+import config
+
+LOG_FILE = getattr(config, "LOG_FILE", "log.txt")
+LOG_MAX_BYTES = getattr(config, "LOG_MAX_BYTES", 10 * 1024 * 1024)
+LOG_BACKUP_COUNT = getattr(config, "LOG_BACKUP_COUNT", 5)
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+BLOCK_SIZE = 8192
+FOLLOW_MAX_BYTES = 64 * 1024
+
+
+def setup_logging(level=logging.INFO) -> logging.handlers.QueueListener:
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    # request handlers only enqueue records; the listener thread does the file/console I/O
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def read_log_tail(path: str, limit: int, before: Optional[int] = None) -> Tuple[List[str], Optional[int]]:
+    with open(path, "rb") as log_file:
+        log_file.seek(0, os.SEEK_END)
+        end = log_file.tell()
+        if before is not None:
+            end = min(before, end)
+
+        pos = end
+        data = b""
+        while pos > 0 and data.count(b"\n") <= limit:
+            read = min(BLOCK_SIZE, pos)
+            pos -= read
+            log_file.seek(pos)
+            data = log_file.read(read) + data
+
+    start = pos
+    if pos > 0:
+        # the first segment is the tail of a line that starts before this window
+        cut = data.index(b"\n") + 1
+        data = data[cut:]
+        start += cut
+
+    offsets = []
+    offset = start
+    segments = data.split(b"\n")
+    for segment in segments:
+        offsets.append(offset)
+        offset += len(segment) + 1
+
+    lines = []
+    cursor = start
+    for segment, offset in zip(reversed(segments), reversed(offsets)):
+        line = segment.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
+        lines.append(line)
+        if len(lines) == limit:
+            cursor = offset
+            break
+    return lines, (cursor if cursor > 0 else None)
+
+
+def read_log_from(path: str, offset: int) -> Tuple[List[str], int]:
+    size = os.path.getsize(path)
+    if size < offset:
+        # the file was rotated underneath us
+        offset = 0
+    with open(path, "rb") as log_file:
+        log_file.seek(offset)
+        data = log_file.read(FOLLOW_MAX_BYTES)
+
+    complete = data.rfind(b"\n") + 1
+    lines = [
+        line.decode("utf-8", errors="replace").strip()
+        for line in data[:complete].split(b"\n")
+    ]
+    return [line for line in lines if line], offset + complete
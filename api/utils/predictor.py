@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api import models
+from api.database import AsyncSessionLocal
+from api.utils.cache import prediction_cache
+from api.utils.chart_codec import encode_chart
+from api.utils.forecast import forecast_projects, summarize_forecast
+from api.utils.llm import llm_client
+from api.utils.prompts import PROMPT_TOKEN_BUDGET, PROMPT_VERSION, build_prompt
+from api.utils.utils import CHART_COLUMNS
+import config
+from api.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+LLM_TIMEOUT_SECONDS = getattr(config, "LLM_TIMEOUT_SECONDS", 30)
+BATCH_MAX_CONCURRENCY = getattr(config, "BATCH_MAX_CONCURRENCY", 4)
+BATCH_MAX_PROJECTS = getattr(config, "BATCH_MAX_PROJECTS", 200)
+PREDICT_MODES = ("local", "llm", "hybrid")
+
+logger = logging.getLogger(__name__)
+
+
+async def _llm_prediction(db: AsyncSession, df: pd.DataFrame, no_cache: bool, timeout=None):
+    # hashing and prompt building walk the whole frame, so they stay off the event loop like forecast_projects
+    cache_key = await run_in_threadpool(prediction_cache.key_for, df, f"{PROMPT_VERSION}:{PROMPT_TOKEN_BUDGET}")
+    prediction = None
+    if no_cache:
+        prediction_cache.bypassed += 1
+    else:
+        prediction = await prediction_cache.get(db, cache_key)
+    if prediction is not None:
+        return prediction, True, None
+
+    prompt, prompt_stats = await run_in_threadpool(build_prompt, df)
+    prediction = await asyncio.wait_for(llm_client.generate(prompt), timeout)
+    await prediction_cache.set(db, cache_key, prediction)
+    return prediction, False, prompt_stats
+
+
+async def predict_frame(db: AsyncSession, df: pd.DataFrame, mode: str = "hybrid", no_cache: bool = False) -> dict:
+    forecast = await run_in_threadpool(forecast_projects, df)
+    result = {"forecast": forecast, "cached": False}
+
+    if mode == "local":
+        result.update(prediction=summarize_forecast(forecast), source="local")
+        return result
+
+    if mode == "llm":
+        prediction, cached, prompt_stats = await _llm_prediction(db, df, no_cache)
+        result.update(prediction=prediction, source="llm", cached=cached, prompt=prompt_stats)
+        return result
+
+    try:
+        llm_client.require_model()
+        prediction, cached, prompt_stats = await _llm_prediction(db, df, no_cache, timeout=LLM_TIMEOUT_SECONDS)
+        result.update(prediction=prediction, source="llm", cached=cached, prompt=prompt_stats)
+    except Exception as e:
+        logger.warning("LLM forecast unavailable, using local engine: %r", e)
+        result.update(prediction=summarize_forecast(forecast), source="local")
+    return result
+
+
+async def run_forecast_job(payload: dict) -> dict:
+    df = payload["frame"]
+    async with AsyncSessionLocal() as db:
+        result = await predict_frame(db, df, mode=payload["mode"], no_cache=payload["no_cache"])
+        recent = models.RecentImport(
+            user_id=payload["user_id"],
+            prediction=result["prediction"],
+            chart_blob=encode_chart(df[CHART_COLUMNS])
+        )
+        db.add(recent)
+        await db.commit()
+    return {**result, "recent_import_id": recent.id}
+
+
+async def predict_projects(df: pd.DataFrame, mode: str, no_cache: bool, max_concurrency: int = BATCH_MAX_CONCURRENCY) -> list:
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(project_id, group: pd.DataFrame) -> dict:
+        async with semaphore:
+            # each project gets its own session: an AsyncSession cannot be shared between concurrent tasks
+            async with AsyncSessionLocal() as db:
+                result = await predict_frame(db, group, mode=mode, no_cache=no_cache)
+                await db.commit()
+        return {"project_id": project_id, "status": "succeeded", **result}
+
+    groups = [(project_id, group.reset_index(drop=True)) for project_id, group in df.groupby("project_id", sort=True)]
+    outcomes = await asyncio.gather(*(run(project_id, group) for project_id, group in groups), return_exceptions=True)
+
+    results = []
+    for (project_id, group), outcome in zip(groups, outcomes):
+        if isinstance(outcome, Exception):
+            logger.warning("Forecast for project %s failed: %r", project_id, outcome)
+            outcome = {"project_id": project_id, "status": "failed", "error": getattr(outcome, "detail", None) or str(outcome)}
+        outcome["project_id"] = project_id.item() if hasattr(project_id, "item") else project_id
+        outcome["frame"] = group
+        results.append(outcome)
+    return results
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Iterable, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api import models
+from api.utils.forecast import forecast_projects
+from api.utils.ingest import as_float64
+from api.utils.responses import dumps
+import config
+from api.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+PROGRESS_UPSERT_BATCH = getattr(config, "PROGRESS_UPSERT_BATCH", 5000)
+PROGRESS_KEY = ["project_id", "days_elapsed"]
+PROGRESS_VALUES = ["days_remaining", "planned_progress", "actual_progress", "materials_used", "workforce"]
+
+
+def progress_records(df: pd.DataFrame) -> Tuple[List[dict], int]:
+    frame = as_float64(df.reindex(columns=PROGRESS_KEY + PROGRESS_VALUES))
+    frame = frame.apply(pd.to_numeric, errors="coerce")
+    valid = frame[PROGRESS_KEY].notna().all(axis=1)
+    skipped = int((~valid).sum())
+    frame = frame[valid].astype({"project_id": "int64", "days_elapsed": "int64"})
+    # one statement cannot touch the same key twice, so the last row for a day wins
+    frame = frame.drop_duplicates(subset=PROGRESS_KEY, keep="last")
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict(orient="records"), skipped
+
+
+def _upsert_statement(dialect: str):
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    ProjectProgress = models.ProjectProgress
+    stmt = insert(ProjectProgress)
+    changed = or_(*(getattr(ProjectProgress, column).is_distinct_from(stmt.excluded[column]) for column in PROGRESS_VALUES))
+    # unchanged rows are left alone and not returned, so RETURNING lists exactly the new or modified days
+    return stmt.on_conflict_do_update(
+        index_elements=PROGRESS_KEY,
+        set_={column: stmt.excluded[column] for column in PROGRESS_VALUES + ["updated_by", "updated_at"]},
+        where=changed,
+    ).returning(ProjectProgress.project_id)
+
+
+async def upsert_progress(db: AsyncSession, records: List[dict], user_id: int) -> Tuple[int, Set[int]]:
+    if not records:
+        return 0, set()
+    stmt = _upsert_statement(db.bind.dialect.name)
+    now = datetime.utcnow()
+    changed_rows = 0
+    changed_projects: Set[int] = set()
+    for start in range(0, len(records), PROGRESS_UPSERT_BATCH):
+        batch = [{**record, "updated_by": user_id, "updated_at": now} for record in records[start:start + PROGRESS_UPSERT_BATCH]]
+        # executemany with RETURNING is sent as multi-row INSERT ... VALUES pages by SQLAlchemy
+        project_ids = (await db.execute(stmt, batch)).scalars().all()
+        changed_rows += len(project_ids)
+        changed_projects.update(project_ids)
+    return changed_rows, changed_projects
+
+
+async def load_progress(db: AsyncSession, project_ids: Iterable[int]) -> pd.DataFrame:
+    ProjectProgress = models.ProjectProgress
+    columns = [getattr(ProjectProgress, column) for column in PROGRESS_KEY + PROGRESS_VALUES]
+    project_ids = sorted(project_ids)
+    rows = []
+    for start in range(0, len(project_ids), PROGRESS_UPSERT_BATCH):
+        result = await db.execute(
+            select(*columns)
+            .where(ProjectProgress.project_id.in_(project_ids[start:start + PROGRESS_UPSERT_BATCH]))
+            .order_by(ProjectProgress.project_id, ProjectProgress.days_elapsed)
+        )
+        rows.extend(result.all())
+    return pd.DataFrame.from_records(rows, columns=PROGRESS_KEY + PROGRESS_VALUES)
+
+
+async def refresh_forecasts(db: AsyncSession, project_ids: Set[int]) -> List[dict]:
+    if not project_ids:
+        return []
+    history = await load_progress(db, project_ids)
+    forecast = await run_in_threadpool(forecast_projects, history)
+
+    ProjectForecast = models.ProjectForecast
+    insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(ProjectForecast)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["project_id"],
+        set_={column: stmt.excluded[column] for column in ("forecast", "rows", "updated_at")},
+    )
+    now = datetime.utcnow()
+    rows = [
+        {"project_id": item["project_id"], "forecast": dumps(item).decode(), "rows": item["samples"], "updated_at": now}
+        for item in forecast
+    ]
+    for start in range(0, len(rows), PROGRESS_UPSERT_BATCH):
+        await db.execute(stmt, rows[start:start + PROGRESS_UPSERT_BATCH])
+    # projects left without usable rows (e.g. no day > 0) must not keep an outdated forecast
+    stale = project_ids - {item["project_id"] for item in forecast}
+    if stale:
+        await db.execute(delete(ProjectForecast).where(ProjectForecast.project_id.in_(stale)))
+    return forecast
+
+
+async def stored_forecasts(db: AsyncSession, project_ids: Optional[List[int]] = None) -> List[dict]:
+    query = select(models.ProjectForecast.forecast).order_by(models.ProjectForecast.project_id)
+    if project_ids:
+        query = query.where(models.ProjectForecast.project_id.in_(project_ids))
+    return [json.loads(forecast) for forecast in (await db.execute(query)).scalars()]
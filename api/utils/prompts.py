@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from typing import List, Tuple
+
+import config
+from api.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+PROMPT_VERSION = "v2"
+PROMPT_TOKEN_BUDGET = getattr(config, "PROMPT_TOKEN_BUDGET", 4000)
+PROMPT_SERIES_POINTS = getattr(config, "PROMPT_SERIES_POINTS", 50)
+CHARS_PER_TOKEN = 4
+
+INSTRUCTIONS = [
+    "You are an AI-powered construction assistant.",
+    "Get the insights and forecast based on the data with current trends in real-time.",
+    "Make it 10 lines with points wise in new line for each point.",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _with_project(df: pd.DataFrame) -> pd.DataFrame:
+    if "project_id" in df.columns:
+        return df
+    return df.assign(project_id=0)
+
+
+def summarize_projects(df: pd.DataFrame) -> pd.DataFrame:
+    frame = _with_project(df).sort_values(["project_id", "days_elapsed"], kind="stable")
+    x = frame["days_elapsed"].astype(np.float64)
+    y = frame["actual_progress"].astype(np.float64)
+    gap = y - frame["planned_progress"].astype(np.float64)
+    frame = frame.assign(_x=x, _y=y, _xx=x * x, _xy=x * y, _gap=gap, _abs_gap=gap.abs())
+
+    grouped = frame.groupby("project_id", sort=True)
+    sums = grouped[["_x", "_y", "_xx", "_xy"]].sum()
+    n = grouped.size()
+    # least-squares slope of actual progress per day, from grouped sums
+    denominator = n * sums["_xx"] - sums["_x"] ** 2
+    slope = (n * sums["_xy"] - sums["_x"] * sums["_y"]) / denominator.where(denominator != 0)
+
+    latest = grouped.tail(1).set_index("project_id")
+    summary = pd.DataFrame({
+        "rows": n,
+        "days_elapsed": latest["days_elapsed"],
+        "days_remaining": latest["days_remaining"],
+        "actual_progress": latest["actual_progress"],
+        "planned_progress": latest["planned_progress"],
+        "progress_per_day": slope,
+        "mean_gap": grouped["_gap"].mean(),
+        "gap_std": grouped["_gap"].std(),
+        "max_abs_gap": grouped["_abs_gap"].max(),
+    })
+    for column in ("materials_used", "workforce"):
+        if column in frame.columns:
+            summary[f"latest_{column}"] = latest[column]
+    return summary.reset_index()
+
+
+def downsample_series(df: pd.DataFrame, points: int) -> pd.DataFrame:
+    frame = _with_project(df).sort_values(["project_id", "days_elapsed"], kind="stable")
+    grouped = frame.groupby("project_id", sort=False)
+    position = grouped.cumcount().to_numpy()
+    size = grouped["days_elapsed"].transform("size").to_numpy()
+    step = np.maximum(np.ceil(size / max(points, 1)), 1)
+    # evenly spaced rows per project, always keeping the latest one
+    keep = (position % step == 0) | (position == size - 1)
+    return frame.loc[keep, ["project_id", "days_elapsed", "planned_progress", "actual_progress"]]
+
+
+def build_prompt(df: pd.DataFrame, token_budget: int = PROMPT_TOKEN_BUDGET) -> Tuple[List[str], dict]:
+    summary = summarize_projects(df)
+    summary = summary.reindex(summary["mean_gap"].abs().sort_values(ascending=False).index)
+    base_tokens = estimate_tokens("\n".join(INSTRUCTIONS))
+
+    stats_text = summary.to_csv(index=False, float_format="%.2f")
+    projects_included = len(summary)
+    while projects_included > 1 and base_tokens + estimate_tokens(stats_text) > token_budget:
+        # keep the projects furthest off plan when even the statistics do not fit
+        projects_included = max(1, projects_included // 2)
+        stats_text = summary.head(projects_included).to_csv(index=False, float_format="%.2f")
+    stats_section = f"Per-project statistics (gap = actual - planned, in percentage points):\n{stats_text}"
+    if projects_included < len(summary):
+        stats_section += f"\n{len(summary) - projects_included} smaller-deviation projects omitted."
+
+    remaining = token_budget - base_tokens - estimate_tokens(stats_section)
+    series_section = ""
+    points = PROMPT_SERIES_POINTS
+    included_ids = summary["project_id"].head(projects_included)
+    series_source = _with_project(df)
+    series_source = series_source[series_source["project_id"].isin(included_ids)]
+    while points >= 2:
+        series_text = downsample_series(series_source, points).to_csv(index=False, float_format="%.2f")
+        candidate = f"Downsampled progress history (up to {points} points per project):\n{series_text}"
+        if estimate_tokens(candidate) <= remaining:
+            series_section = candidate
+            break
+        points //= 2
+    else:
+        points = 0
+
+    prompt = INSTRUCTIONS + [stats_section]
+    if series_section:
+        prompt.append(series_section)
+
+    prompt_chars = sum(len(part) for part in prompt)
+    metrics = {
+        "rows": int(len(df)),
+        "projects": int(len(summary)),
+        "projects_included": int(projects_included),
+        "series_points_per_project": points,
+        "prompt_chars": prompt_chars,
+        "estimated_tokens": estimate_tokens("\n".join(prompt)),
+        "token_budget": token_budget,
+    }
+    prompt_metrics.record(metrics)
+    logger.info("Built prompt: %s", metrics)
+    return prompt, metrics
+
+
+class PromptMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+        self.total_rows = 0
+        self.last = None
+
+    def record(self, metrics: dict):
+        with self._lock:
+            self.count += 1
+            self.total_tokens += metrics["estimated_tokens"]
+            self.max_tokens = max(self.max_tokens, metrics["estimated_tokens"])
+            self.total_rows += metrics["rows"]
+            self.last = metrics
+
+    def stats(self) -> dict:
+        return {
+            "prompts": self.count,
+            "total_estimated_tokens": self.total_tokens,
+            "max_estimated_tokens": self.max_tokens,
+            "mean_estimated_tokens": self.total_tokens / self.count if self.count else 0,
+            "total_rows": self.total_rows,
+            "last": self.last,
+        }
+
+
+prompt_metrics = PromptMetrics()
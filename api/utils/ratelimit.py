@@ -0,0 +1,150 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from api import auth
+from api.utils.metrics import registry
+import config
+
+RATE_LIMIT_ENABLED = getattr(config, "RATE_LIMIT_ENABLED", True)
+RATE_LIMITS = getattr(config, "RATE_LIMITS", {
+    "auth": (10, 10),
+    "password": (5, 5),
+    "predict": (10, 20),
+    "upload": (5, 10),
+})
+CONCURRENCY_LIMITS = getattr(config, "CONCURRENCY_LIMITS", {"predict": 8, "upload": 4})
+RATE_LIMIT_MAX_KEYS = getattr(config, "RATE_LIMIT_MAX_KEYS", 100_000)
+
+# endpoint class per route; classes in KEY_BY_IP are reached before login, the rest are keyed per user
+ENDPOINT_CLASSES = {
+    ("POST", "/login"): "auth",
+    ("POST", "/sign-up"): "auth",
+    ("POST", "/change-password"): "password",
+    ("POST", "/predict"): "predict",
+    ("POST", "/predict/batch"): "predict",
+    ("POST", "/predict/jobs"): "predict",
+    ("POST", "/predict/stream"): "predict",
+    ("POST", "/upload-profile-pic"): "upload",
+}
+KEY_BY_IP = {"auth"}
+
+rate_limited = registry.counter("rate_limited_total", "Requests rejected with 429 by endpoint class and reason.")
+
+
+class RateLimitBackend(ABC):
+    # a shared store (e.g. a Redis token bucket script) implements this same call so limits hold across workers
+    @abstractmethod
+    async def hit(self, key: str, burst: float, per_second: float) -> float:
+        ...
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def hit(self, key: str, burst: float, per_second: float) -> float:
+        # token bucket: returns 0 when the request is admitted, otherwise seconds until a token frees up
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * per_second)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / per_second
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimiter:
+    # sheds instead of queueing: a full slot set means the resource is already saturated
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+
+
+def _client_key(scope, endpoint_class: str) -> str:
+    if endpoint_class not in KEY_BY_IP:
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                payload = auth.decode_token(token) if scheme.lower() == "bearer" else None
+                if payload and payload.get("userid"):
+                    return f"user:{payload['userid']}"
+                break
+    # unauthenticated requests are rejected by the endpoint anyway; bucket them by address
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def too_many_requests(detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    def __init__(
+        self,
+        app,
+        backend: Optional[RateLimitBackend] = None,
+        limits: Dict[str, Tuple[float, float]] = RATE_LIMITS,
+        concurrency: Dict[str, int] = CONCURRENCY_LIMITS,
+        enabled: bool = RATE_LIMIT_ENABLED,
+    ):
+        self.app = app
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.limits = limits
+        self.enabled = enabled
+        self.limiters = {name: ConcurrencyLimiter(limit) for name, limit in concurrency.items()}
+
+    async def __call__(self, scope, receive, send):
+        endpoint_class = None
+        if self.enabled and scope["type"] == "http":
+            endpoint_class = ENDPOINT_CLASSES.get((scope["method"], scope["path"]))
+        if endpoint_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        # checked before routing, so rejected uploads are never read or parsed
+        limit = self.limits.get(endpoint_class)
+        if limit is not None:
+            burst, per_minute = limit
+            wait = await self.backend.hit(f"{endpoint_class}:{_client_key(scope, endpoint_class)}", burst, per_minute / 60)
+            if wait > 0:
+                rate_limited.inc(endpoint_class=endpoint_class, reason="rate")
+                await too_many_requests("Too many requests, slow down.", wait)(scope, receive, send)
+                return
+
+        limiter = self.limiters.get(endpoint_class)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        if not limiter.try_acquire():
+            rate_limited.inc(endpoint_class=endpoint_class, reason="concurrency")
+            await too_many_requests("Server is busy, try again shortly.", 1)(scope, receive, send)
+            return
+        try:
+            # held until the response body is fully sent, streaming responses included
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
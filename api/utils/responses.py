@@ -0,0 +1,83 @@
+import datetime
+import decimal
+import hashlib
+from typing import Any
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.middleware.gzip import GZipMiddleware
+
+from api.utils.lazy import lazy_import
+import config
+
+COMPRESSION_MIN_BYTES = getattr(config, "COMPRESSION_MIN_BYTES", 1024)
+COMPRESSION_LEVEL = getattr(config, "COMPRESSION_LEVEL", 6)
+# server-sent event streams must reach the client chunk by chunk, which gzip would hold back
+UNCOMPRESSED_PATHS = {"/predict/stream", "/logs/follow"}
+ETAG_CACHE_CONTROL = "private, no-cache"
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# orjson already writes NaN/Inf as null and handles datetimes and numpy arrays natively
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient="records")
+    if isinstance(obj, pd.Series):
+        return obj.tolist()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def make_etag(*parts) -> str:
+    return '"' + hashlib.sha256(dumps(parts)).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so a W/ prefix added by a proxy still matches
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL})
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES, compresslevel: int = COMPRESSION_LEVEL):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] not in UNCOMPRESSED_PATHS:
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
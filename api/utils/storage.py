@@ -0,0 +1,117 @@
+import asyncio
+import io
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+import config
+
+STORAGE_BACKEND = getattr(config, "STORAGE_BACKEND", "s3")
+STORAGE_MAX_CONCURRENCY = getattr(config, "STORAGE_MAX_CONCURRENCY", 8)
+LOCAL_STORAGE_DIR = getattr(config, "LOCAL_STORAGE_DIR", "storage")
+LOCAL_STORAGE_URL = getattr(config, "LOCAL_STORAGE_URL", "/storage/")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class StorageBackend(ABC):
+    def __init__(self, max_concurrency: int = STORAGE_MAX_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @abstractmethod
+    def _put(self, key: str, data: bytes, content_type: str, cache_control: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def url_for(self, key: str) -> str:
+        ...
+
+    async def put(self, key: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> str:
+        async with self._semaphore:
+            await run_in_threadpool(self._put, key, data, content_type, cache_control)
+        return self.url_for(key)
+
+    async def close(self):
+        pass
+
+
+class S3Storage(StorageBackend):
+    def __init__(self, bucket: str, region: str, access_key: str, secret_key: str, public_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.public_url = public_url
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # boto3 is slow to import and only needed for uploads, so the client is built on first use;
+        # boto3 clients are thread-safe, and one shared client keeps its connection pool warm
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+                    from botocore.config import Config
+
+                    self._client = boto3.client(
+                        "s3",
+                        region_name=self.region,
+                        aws_access_key_id=self.access_key,
+                        aws_secret_access_key=self.secret_key,
+                        config=Config(max_pool_connections=STORAGE_MAX_CONCURRENCY),
+                    )
+        return self._client
+
+    def _put(self, key: str, data: bytes, content_type: str, cache_control: Optional[str] = None):
+        extra_args = {"ContentType": content_type}
+        if cache_control:
+            extra_args["CacheControl"] = cache_control
+        self.client.upload_fileobj(io.BytesIO(data), self.bucket, key, ExtraArgs=extra_args)
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_url}{key}"
+
+    async def close(self):
+        if self._client is not None:
+            self._client.close()
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str, public_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+        self.public_url = public_url
+        os.makedirs(root, exist_ok=True)
+
+    def _put(self, key: str, data: bytes, content_type: str, cache_control: Optional[str] = None):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_url}{key}"
+
+
+def create_storage() -> StorageBackend:
+    if STORAGE_BACKEND == "local":
+        return LocalStorage(LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL)
+    return S3Storage(
+        bucket=config.AWS_BUCKET_NAME,
+        region=config.AWS_BUCKET_REGION,
+        access_key=config.AWS_ACCESS_KEY,
+        secret_key=config.AWS_SECRET_KEY,
+        public_url=config.CLOUDFRONT_DOMAIN,
+    )
+
+
+def get_storage(request: Request) -> StorageBackend:
+    return request.app.state.storage
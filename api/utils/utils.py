@@ -1,14 +1,19 @@
-import math
+import json
+import base64
+from datetime import datetime
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-import google.generativeai as genai
 from api import models, auth  
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
-from api.database import AsyncSessionLocal
+from api.database import get_db, get_read_db
+from api.utils.responses import dumps
+from api.utils.cache import user_cache
+from api.utils.lazy import lazy_import
+import config
+
+genai = lazy_import("google.generativeai")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
@@ -20,28 +25,58 @@ generation_config = {
     "response_mime_type": "text/plain",
 }
 
-model = genai.GenerativeModel(
-    model_name="gemini-2.0-flash-thinking-exp-01-21",
-    generation_config=generation_config,
-)
+def create_model():
+    # google.generativeai takes most of a second to import, so it is only loaded on first use
+    genai.configure(api_key=config.GEMINI_API_KEY)
+    return genai.GenerativeModel(
+        model_name="gemini-2.0-flash-thinking-exp-01-21",
+        generation_config=generation_config,
+    )
 
-def sanitize_nans(data):
-    if isinstance(data, dict):
-        return {k: sanitize_nans(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [sanitize_nans(item) for item in data]
-    elif isinstance(data, float) and math.isnan(data):
-        return None  
-    return data
+CHART_COLUMNS = ["days_elapsed", "planned_progress", "actual_progress"]
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
-        yield session
+IMPORT_COLUMNS = {"project_id", "progress_percent", "materials_used", "workforce", "days_elapsed", "days_remaining"}
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> models.User:
+def normalize_column_name(column) -> str:
+    return str(column).strip().lower().replace(" ", "_")
+
+def check_progress_header(columns):
+    normalized = {normalize_column_name(c) for c in columns}
+    if "days_elapsed" not in normalized or "days_remaining" not in normalized:
+        raise HTTPException(status_code=400, detail="Missing required columns: days_elapsed and/or days_remaining.")
+
+def check_import_header(columns):
+    if not IMPORT_COLUMNS.issubset(set(columns)):
+        raise HTTPException(status_code=400, detail="CSV format is invalid. Expected columns: " + ", ".join(IMPORT_COLUMNS))
+
+def normalize_progress_frame(df):
+    # column names are already normalized by ingest_csv
+    column_mapping = {"progress_percent": "actual_progress"}
+    df.rename(columns=column_mapping, inplace=True)
+    check_progress_header(df.columns)
+    if "planned_progress" not in df.columns:
+        df["planned_progress"] = (df["days_elapsed"] / (df["days_elapsed"] + df["days_remaining"])) * 100
+
+    missing_columns = [col for col in CHART_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(missing_columns)}. Check CSV format.")
+    return df
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def resolve_user(token: str, db: AsyncSession) -> models.User:
     payload = auth.decode_token(token)
     if not payload:
         raise HTTPException(
@@ -58,11 +93,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    
-    result = await db.execute(
-        select(models.User).where(models.User.userid == userid)
-    )
-    db_user = result.scalars().first()
+    db_user = await user_cache.get(db, userid)
 
     if not db_user:
         raise HTTPException(
@@ -73,6 +104,19 @@ async def get_current_user(
 
     return db_user
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db),
+) -> models.User:
+    return await resolve_user(token, db)
+
+async def get_current_user_for_update(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> models.User:
+    # attached to the request's write session, for endpoints that modify and commit the user
+    return await resolve_user(token, db)
+
 def require_sudo(current_user: models.User = Depends(get_current_user)):
     if not current_user.is_sudo:
         raise HTTPException(
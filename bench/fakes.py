@@ -0,0 +1,45 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+FAKE_RESPONSE = "\n".join(f"{i}. Progress is tracking close to plan." for i in range(1, 11))
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=len(text) // 4,
+        )
+
+
+class FakeStream(FakeResponse):
+    def __init__(self, text: str, prompt_tokens: int, latency: float, chunks: int = 5):
+        super().__init__(text, prompt_tokens)
+        self.latency = latency
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        size = max(1, len(self.text) // self.chunks)
+        for start in range(0, len(self.text), size):
+            await asyncio.sleep(self.latency / self.chunks)
+            yield SimpleNamespace(text=self.text[start:start + size])
+
+
+class FakeGenerativeModel:
+    # stands in for google.generativeai.GenerativeModel: same coroutine API, fixed latency plus jitter
+    def __init__(self, latency: float = 0.5, jitter: float = 0.1, text: str = FAKE_RESPONSE):
+        self.latency = latency
+        self.jitter = jitter
+        self.text = text
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    async def generate_content_async(self, prompt, stream: bool = False):
+        prompt_tokens = sum(len(part) for part in prompt) // 4
+        if stream:
+            return FakeStream(self.text, prompt_tokens, self._delay())
+        await asyncio.sleep(self._delay())
+        return FakeResponse(self.text, prompt_tokens)
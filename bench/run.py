@@ -0,0 +1,269 @@
+import argparse
+import ast
+import asyncio
+import io
+import json
+import logging
+import platform
+import runpy
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("login", "protected", "predict", "recent-imports", "import-csv")
+UPLOAD_FORMATS = ("csv", "parquet", "arrow")
+BENCH_USER = {"username": "bench", "email": "bench@example.com", "password": "bench-password", "is_sudo": True}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the API in-process against local stand-ins for Neon, Gemini and S3.")
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file; pass a local postgresql+asyncpg URL to use Postgres")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per scenario")
+    parser.add_argument("--rows", type=int, default=2000, help="rows in the generated CSV uploads")
+    parser.add_argument("--projects", type=int, default=10, help="projects in the generated CSV uploads")
+    parser.add_argument("--upload-format", default="csv", choices=UPLOAD_FORMATS, help="file format of the generated uploads")
+    parser.add_argument("--predict-mode", default="hybrid", choices=("local", "llm", "hybrid"))
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake Gemini latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="override a config setting, e.g. --set BCRYPT_ROUNDS=10")
+    parser.add_argument("--baseline", type=Path, help="compare against a stored baseline and exit 1 on regressions")
+    parser.add_argument("--save-baseline", type=Path, help="write the results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before a scenario counts as a regression")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    return parser.parse_args(argv)
+
+
+def install_config(args, workdir: Path) -> dict:
+    # the app reads every setting from a top-level `config` module; build one from
+    # sample_config.py with local stand-ins so no Neon, Gemini or S3 credentials are needed
+    values = {k: v for k, v in runpy.run_path(str(ROOT / "sample_config.py")).items() if k.isupper()}
+    values.update(
+        DATABASE_URL=args.database_url or f"sqlite+aiosqlite:///{workdir / 'bench.db'}",
+        DATABASE_SSL=False,
+        STORAGE_BACKEND="local",
+        LOCAL_STORAGE_DIR=str(workdir / "storage"),
+        LOG_FILE=str(workdir / "log.txt"),
+        ORIGINS=[],
+        # the driver sends every request from one client, which the limiter would otherwise throttle
+        RATE_LIMIT_ENABLED=False,
+    )
+    for item in args.set:
+        name, _, raw = item.partition("=")
+        try:
+            values[name] = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            values[name] = raw
+    module = types.ModuleType("config")
+    module.__dict__.update(values)
+    sys.modules["config"] = module
+    return values
+
+
+def progress_frame(rows: int, projects: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    per_project = max(1, rows // projects)
+    project_id = np.repeat(np.arange(1, projects + 1), per_project)
+    days = np.tile(np.arange(per_project), projects)
+    duration = per_project + 30
+    planned = days / duration * 100
+    actual = np.clip(planned * rng.normal(0.95, 0.05, len(days)) + rng.normal(0, 1, len(days)), 0, 100)
+    return pd.DataFrame({
+        "project_id": project_id,
+        "days_elapsed": days,
+        "days_remaining": duration - days,
+        "planned_progress": planned.round(2),
+        "actual_progress": actual.round(2),
+        "materials_used": rng.integers(50, 500, len(days)),
+        "workforce": rng.integers(5, 50, len(days)),
+    })
+
+
+def import_frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "project_id": np.arange(1, rows + 1),
+        "progress_percent": rng.integers(0, 100, rows),
+        "materials_used": rng.integers(50, 500, rows),
+        "workforce": rng.integers(5, 50, rows),
+        "days_elapsed": rng.integers(1, 300, rows),
+        "days_remaining": rng.integers(0, 300, rows),
+    })
+
+
+def encode_upload(frame: pd.DataFrame, fmt: str) -> bytes:
+    if fmt == "csv":
+        return frame.to_csv(index=False).encode()
+    buffer = io.BytesIO()
+    if fmt == "parquet":
+        frame.to_parquet(buffer, index=False)
+    else:
+        frame.to_feather(buffer)
+    return buffer.getvalue()
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+
+async def drive(call, total: int, concurrency: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await call()
+
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await call()
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run(args, scenarios) -> dict:
+    import httpx
+    from bench.fakes import FakeGenerativeModel
+    from api.utils.llm import llm_client
+    from main import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    llm_client.model = FakeGenerativeModel(latency=args.llm_latency, jitter=args.llm_jitter)
+    progress = encode_upload(progress_frame(args.rows, args.projects, args.seed), args.upload_format)
+    imports = encode_upload(import_frame(args.rows, args.seed), args.upload_format)
+
+    def upload(data: bytes):
+        return {"file": (f"bench.{args.upload_format}", io.BytesIO(data), "application/octet-stream")}
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            response = await client.post("/sign-up", json=BENCH_USER)
+            response.raise_for_status()
+            login_form = {"username": BENCH_USER["username"], "password": BENCH_USER["password"]}
+            response = await client.post("/login", data=login_form)
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            # give /recent-imports something to page through
+            for _ in range(20):
+                response = await client.post("/predict", params={"mode": "local"}, files=upload(progress), headers=headers)
+                response.raise_for_status()
+
+            calls = {
+                "login": lambda: client.post("/login", data=login_form),
+                "protected": lambda: client.get("/protected", headers=headers),
+                "predict": lambda: client.post(
+                    "/predict",
+                    params={"mode": args.predict_mode, "no_cache": True, "max_points": 500},
+                    files=upload(progress),
+                    headers=headers,
+                ),
+                "recent-imports": lambda: client.get("/recent-imports", params={"limit": 10, "max_points": 500}, headers=headers),
+                "import-csv": lambda: client.post("/import-csv", files=upload(imports), headers=headers),
+            }
+            for name in scenarios:
+                results[name] = await drive(calls[name], args.requests, args.concurrency, args.warmup)
+                print(format_row(name, results[name]), flush=True)
+    return results
+
+
+def format_row(name: str, result: dict) -> str:
+    return (
+        f"{name:<16} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.1f} ms  "
+        f"p95 {result['p95_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  errors {result['errors']}"
+    )
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+    for name, result in results.items():
+        if result["errors"]:
+            regressions.append(f"{name}: {result['errors']} failed requests")
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if result[key] > reference[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {result[key]} > baseline {reference[key]}")
+        if result["throughput_rps"] < reference["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput_rps']} < baseline {reference['throughput_rps']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    params = {
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "rows": args.rows,
+        "projects": args.projects,
+        "upload_format": args.upload_format,
+        "predict_mode": args.predict_mode,
+        "llm_latency": args.llm_latency,
+        "llm_jitter": args.llm_jitter,
+        "overrides": sorted(args.set),
+    }
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        config = install_config(args, Path(workdir))
+        params["database"] = config["DATABASE_URL"].split(":", 1)[0]
+        results = asyncio.run(run(args, scenarios))
+
+    report = {"params": params, "python": platform.python_version(), "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2))
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("params") != params:
+            print("Warning: baseline was recorded with different parameters; comparisons may not be meaningful.", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
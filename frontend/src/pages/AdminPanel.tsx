@@ -55,14 +55,21 @@ const AdminPanel: React.FC = () => {
 
     setLoading(true);
     try {
-      const response = await axios.get(`${API_BASE_URL}/admin-panel-users`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (Array.isArray(response.data)) {
-        setUsers(response.data);
-      } else {
-        setError('Unexpected data format received.');
-      }
+      const allUsers: User[] = [];
+      let cursor: string | undefined;
+      do {
+        const response = await axios.get(`${API_BASE_URL}/admin-panel-users`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { limit: 500, cursor },
+        });
+        if (!Array.isArray(response.data)) {
+          setError('Unexpected data format received.');
+          return;
+        }
+        allUsers.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+      } while (cursor);
+      setUsers(allUsers);
     } catch (err: any) {
       if (err.response && err.response.status === 401) {
         setError('Session expired, please login again.');
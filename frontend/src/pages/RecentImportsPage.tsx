@@ -12,7 +12,8 @@ import {
   Box,
   Fab,
   Collapse,
-  Tooltip
+  Tooltip,
+  Button
 } from '@mui/material';
 
 import ReactMarkdown from 'react-markdown';
@@ -34,36 +35,45 @@ interface RecentImport {
 }
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
+const PAGE_SIZE = 20;
 
 const RecentImportsPage: React.FC = () => {
   const [imports, setImports] = useState<RecentImport[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [navOpen, setNavOpen] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
   const navigate = useNavigate();
 
+  const fetchRecentImports = async (cursor?: string) => {
+    const token = localStorage.getItem('token');
+    if (!token) {
+      navigate('/');
+      return;
+    }
+    try {
+      const response = await axios.get(`${API_BASE_URL}/recent-imports`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { limit: PAGE_SIZE, cursor },
+      });
+      setImports((previous) => (cursor ? [...previous, ...response.data] : response.data));
+      setNextCursor(response.headers['x-next-cursor']);
+    } catch (err: any) {
+      setError(err.response?.data?.message || 'Failed to fetch recent imports');
+    }
+  };
+
   useEffect(() => {
-    const fetchRecentImports = async () => {
-      const token = localStorage.getItem('token');
-      if (!token) {
-        navigate('/');
-        return;
-      }
-      try {
-        const response = await axios.get(`${API_BASE_URL}/recent-imports`, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        setImports(response.data);
-      } catch (err: any) {
-        setError(err.response?.data?.message || 'Failed to fetch recent imports');
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchRecentImports();
+    fetchRecentImports().finally(() => setLoading(false));
   }, [navigate]);
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    await fetchRecentImports(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleLogout = () => {
     localStorage.removeItem('token');
     navigate('/');
@@ -113,6 +123,14 @@ const RecentImportsPage: React.FC = () => {
         ))
       )}
 
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mb: 4 }}>
+          <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+            {loadingMore ? <CircularProgress size={24} /> : 'Load more'}
+          </Button>
+        </Box>
+      )}
+
       <Box
         sx={{
           position: 'fixed',
@@ -32,6 +32,7 @@ export const fetchProtectedData = async (token: string) => {
 export const fetchRecentImports = async (token: string) => {
   return axios.get<RecentImport[]>(`${API_BASE_URL}/recent-imports`, {
     headers: { Authorization: `Bearer ${token}` },
+    params: { limit: 1 },
   });
 };
 
@@ -1,40 +1,116 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import logging
 import os
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import users
+from fastapi.staticfiles import StaticFiles
+from api import models
+from api.routes import users, metrics
 from api.database import *
+from api.utils.hashing import password_hasher
+from api.utils.images import shutdown_image_workers
+from api.utils.ingest import ARROW_AVAILABLE
+from api.utils.jobs import job_queue
+from api.utils.lazy import preload
+from api.utils.llm import llm_client
+from api.utils.predictor import run_forecast_job
+from api.utils.metrics import MetricsMiddleware, startup_duration
+from api.utils.ratelimit import RateLimitMiddleware
+from api.utils.responses import CompressionMiddleware, FastJSONResponse
+from api.utils.storage import STORAGE_BACKEND, LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL, create_storage
 from contextlib import asynccontextmanager
-import logging
 import config
+from api.utils.logs import setup_logging
+
+DB_POOL_PREWARM = getattr(config, "DB_POOL_PREWARM", 2)
+PRELOAD_MODULES = getattr(config, "PRELOAD_MODULES", True)
+
+log_listener = setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def preload_heavy_modules():
+    # runs in a worker thread once the app is serving, so the first /predict or avatar upload
+    # does not pay for these imports while logins and dashboard reads are not held back by them
+    try:
+        modules = ["pandas", "PIL.Image", "PIL.ImageOps"]
+        if ARROW_AVAILABLE:
+            modules += ["pyarrow.csv", "pyarrow.parquet"]
+        timings = preload(*modules)
+        start = time.perf_counter()
+        llm_client.require_model()
+        timings["gemini"] = time.perf_counter() - start
+        logger.info("Preloaded modules: %s", {name: round(seconds * 1000, 1) for name, seconds in timings.items()})
+    except Exception:
+        logger.exception("Background preload failed")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("log.txt"),
-        logging.StreamHandler()
-    ]
-)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    timings = {"imports": IMPORT_SECONDS}
+    phase_started = time.perf_counter()
+
+    def phase(name):
+        nonlocal phase_started
+        now = time.perf_counter()
+        timings[name] = now - phase_started
+        phase_started = now
+
+    await ensure_schema(models.SCHEMA_VERSION)
+    phase("schema")
+    if DB_POOL_PREWARM:
+        await prewarm_pool(DB_POOL_PREWARM)
+        phase("pool_prewarm")
+    app.state.storage = create_storage()
+    await job_queue.start({"forecast": run_forecast_job})
+    phase("services")
+
+    for name, seconds in timings.items():
+        startup_duration.set(seconds, phase=name)
+    timings["total"] = time.perf_counter() - IMPORT_STARTED
+    logger.info("Startup timings (ms): %s", {name: round(seconds * 1000, 1) for name, seconds in timings.items()})
+    app.state.startup_timings = timings
+
+    preload_task = asyncio.create_task(asyncio.to_thread(preload_heavy_modules)) if PRELOAD_MODULES else None
     yield
+    if preload_task is not None:
+        await preload_task
+    await job_queue.stop()
+    await dispose_engines()
+    await app.state.storage.close()
+    password_hasher.shutdown()
+    shutdown_image_workers()
+    log_listener.stop()
 
 
-app = FastAPI(title="Raiden Track API", lifespan=lifespan)
+app = FastAPI(title="Raiden Track API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+# wraps the limiter so rejected requests are still measured
+app.add_middleware(MetricsMiddleware)
+# outermost, so responses produced by the middleware above (429s included) carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=config.ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"],  
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Total-Count-Exact", "Retry-After"],
 )
 
 app.include_router(users.router)
+app.include_router(metrics.router)
+
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(LOCAL_STORAGE_URL.rstrip("/"), StaticFiles(directory=LOCAL_STORAGE_DIR), name="storage")
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
 
 if __name__ == '__main__':
     uvicorn.run(app, host="0.0.0.0", port=config.PORT, log_config=None)
\ No newline at end of file
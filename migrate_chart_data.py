@@ -0,0 +1,73 @@
+import asyncio
+import json
+import sys
+
+from sqlalchemy import select, text, update
+
+from api import models
+from api.database import AsyncSessionLocal, engine
+from api.utils.chart_codec import encode_records
+
+BATCH_SIZE = 500
+
+
+async def add_columns():
+    async with engine.begin() as conn:
+        await conn.execute(text("ALTER TABLE recent_imports ADD COLUMN IF NOT EXISTS chart_blob BYTEA"))
+        await conn.execute(text("ALTER TABLE recent_imports ALTER COLUMN chart_data DROP NOT NULL"))
+
+
+async def add_indexes():
+    # create_all skips tables that already exist, so indexes added to existing tables are created here
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_recent_imports_user_created_id "
+            "ON recent_imports (user_id, created_at DESC, id DESC)"
+        ))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_users_username_prefix ON users (lower(username) text_pattern_ops)"
+        ))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_users_email_prefix ON users (lower(email) text_pattern_ops)"
+        ))
+
+
+async def backfill(batch_size: int = BATCH_SIZE) -> int:
+    migrated = 0
+    last_id = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(models.RecentImport.id, models.RecentImport.chart_data)
+                .where(models.RecentImport.id > last_id, models.RecentImport.chart_blob.is_(None))
+                .order_by(models.RecentImport.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                return migrated
+
+            for row in rows:
+                records = json.loads(row.chart_data) if row.chart_data else []
+                await session.execute(
+                    update(models.RecentImport)
+                    .where(models.RecentImport.id == row.id)
+                    .values(chart_blob=encode_records(records), chart_data=None)
+                )
+            await session.commit()
+            migrated += len(rows)
+            last_id = rows[-1].id
+            print(f"Migrated {migrated} rows (last id {last_id})")
+
+
+async def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else BATCH_SIZE
+    await add_columns()
+    await add_indexes()
+    migrated = await backfill(batch_size)
+    print(f"Chart data migration complete: {migrated} rows converted.")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,17 @@
+import importlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# the app reads settings from config.py, which is not checked in; the unit tests run on the sample
+# settings with an in-memory database that is never connected to
+try:
+    importlib.import_module("config")
+except ImportError:
+    config = importlib.import_module("sample_config")
+    config.DATABASE_URL = "sqlite+aiosqlite://"
+    config.DATABASE_REPLICA_URL = ""
+    config.DATABASE_SSL = False
+    sys.modules["config"] = config
@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.utils.chart_codec import (
+    MAGIC,
+    decode_chart,
+    decode_chart_columns,
+    decode_chart_frame,
+    encode_chart,
+    encode_records,
+    load_chart_data,
+)
+
+
+def test_round_trip():
+    records = [
+        {"days_elapsed": 1.0, "planned_progress": 2.5, "actual_progress": 1.25},
+        {"days_elapsed": 2.0, "planned_progress": 66.6667, "actual_progress": 3.1416},
+        {"days_elapsed": 3.0, "planned_progress": 100.0, "actual_progress": 0.0},
+    ]
+    blob = encode_records(records)
+    assert blob.startswith(MAGIC)
+    assert decode_chart(blob) == records
+
+
+def test_nulls_survive_the_bitmap():
+    # nine rows so the null bitmap spans two bytes
+    values = [float(i) for i in range(9)]
+    values[0] = None
+    values[8] = None
+    records = [{"days_elapsed": float(i), "actual_progress": value} for i, value in enumerate(values)]
+    records[4]["days_elapsed"] = float("nan")
+
+    decoded = decode_chart(encode_records(records))
+    assert [row["actual_progress"] for row in decoded] == values
+    assert decoded[4]["days_elapsed"] is None
+    assert [row["days_elapsed"] for row in decoded if row["days_elapsed"] is not None] == [0, 1, 2, 3, 5, 6, 7, 8]
+
+
+def test_decode_columns_returns_values_and_mask():
+    blob = encode_chart(pd.DataFrame({"x": [1.0, np.inf, 3.0], "y": [np.nan, 2.0, 4.0]}))
+    columns = decode_chart_columns(blob)
+    assert list(columns) == ["x", "y"]
+    values, mask = columns["x"]
+    assert mask.tolist() == [False, True, False]
+    assert values[~mask].tolist() == [1.0, 3.0]
+    assert columns["y"][1].tolist() == [True, False, False]
+
+
+def test_decode_frame_uses_nan_for_nulls():
+    frame = decode_chart_frame(encode_records([{"x": 1.0, "y": None}, {"x": 2.0, "y": 5.5}]))
+    assert frame["x"].tolist() == [1.0, 2.0]
+    assert math.isnan(frame["y"][0]) and frame["y"][1] == 5.5
+
+
+def test_empty_chart():
+    assert decode_chart(encode_chart(pd.DataFrame({"x": []}))) == []
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        decode_chart(b"XX1" + encode_records([{"x": 1.0}])[len(MAGIC):])
+
+
+def test_legacy_json_is_still_loaded():
+    assert load_chart_data(None, '[{"x": 1.0}]') == [{"x": 1.0}]
+    assert load_chart_data(encode_records([{"x": 1.0}]), None) == [{"x": 1.0}]
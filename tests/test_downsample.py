@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.utils.downsample import MIN_POINTS, downsample_frame, downsample_records, lttb_indices
+
+
+def series(n=1000):
+    x = np.arange(n, dtype=np.float64)
+    return x, np.sin(x / 25) * 50 + 50
+
+
+@pytest.mark.parametrize("max_points", [MIN_POINTS, 10, 97, 999])
+def test_keeps_endpoints_and_requested_length(max_points):
+    x, y = series()
+    indices = lttb_indices(x, y, max_points)
+    assert len(indices) == max_points
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("max_points", [0, MIN_POINTS - 1, 1000, 5000])
+def test_returns_every_point_when_it_cannot_downsample(max_points):
+    x, y = series()
+    assert lttb_indices(x, y, max_points).tolist() == list(range(len(x)))
+
+
+def test_keeps_a_spike():
+    x, y = series()
+    y[500] = 1000
+    assert 500 in lttb_indices(x, y, 20)
+
+
+def test_keeps_a_spike_in_any_series():
+    x, y = series()
+    flat = np.zeros_like(y)
+    flat[321] = -500
+    assert 321 in lttb_indices(x, np.vstack([y, flat]), 20)
+
+
+def test_downsample_frame():
+    x, y = series()
+    df = pd.DataFrame({"days_elapsed": x, "planned_progress": y, "actual_progress": y / 2})
+    small = downsample_frame(df, 50)
+    assert len(small) == 50
+    assert small["days_elapsed"].iloc[0] == 0 and small["days_elapsed"].iloc[-1] == 999
+    assert list(small.columns) == list(df.columns)
+    assert downsample_frame(df, None) is df
+
+
+def test_downsample_records_tolerates_nulls():
+    records = [{"days_elapsed": i, "actual_progress": None if i % 7 == 0 else i / 2} for i in range(100)]
+    small = downsample_records(records, 10)
+    assert len(small) == 10
+    assert small[0]["days_elapsed"] == 0 and small[-1]["days_elapsed"] == 99
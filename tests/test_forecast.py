@@ -0,0 +1,78 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from api.utils.forecast import BOOTSTRAP_MAX_GROUPS, forecast_projects, summarize_forecast
+
+
+def progress_frame(project_id, days, rate, noise, seed=0):
+    rng = np.random.default_rng(seed)
+    elapsed = np.arange(1, days + 1)
+    return pd.DataFrame({
+        "project_id": project_id,
+        "days_elapsed": elapsed,
+        "days_remaining": days + 10 - elapsed,
+        "actual_progress": np.clip(elapsed * rate + rng.normal(0, noise, days), 0, 100),
+        "planned_progress": elapsed.astype(float),
+    })
+
+
+def test_ci_brackets_the_estimate():
+    df = pd.concat([progress_frame(1, 40, 0.8, 2.0), progress_frame(2, 60, 1.2, 5.0, seed=1)])
+    forecast = forecast_projects(df)
+    assert [item["project_id"] for item in forecast] == [1, 2]
+    for item in forecast:
+        low, high = item["estimated_days_remaining_ci"]
+        assert low <= item["estimated_days_remaining"] <= high
+        assert low < high
+
+
+def test_ci_collapses_without_noise():
+    item, = forecast_projects(progress_frame(1, 30, 0.5, 0.0))
+    assert item["rate_per_day"] == 0.5
+    assert item["estimated_days_remaining"] == 170.0
+    assert item["estimated_days_remaining_ci"] == [170.0, 170.0]
+
+
+def test_ci_brackets_the_estimate_for_large_projects():
+    # more rows than BOOTSTRAP_MAX_GROUPS, so rows are resampled in groups
+    item, = forecast_projects(progress_frame(1, BOOTSTRAP_MAX_GROUPS * 3, 0.01, 1.0))
+    low, high = item["estimated_days_remaining_ci"]
+    assert low <= item["estimated_days_remaining"] <= high
+
+
+def test_same_seed_gives_the_same_interval():
+    df = progress_frame(1, 50, 1.0, 3.0)
+    assert forecast_projects(df, seed=7) == forecast_projects(df, seed=7)
+
+
+def test_blank_planned_progress_falls_back_to_the_schedule():
+    df = progress_frame(1, 30, 0.5, 0.0)
+    df.loc[df.index[-5:], "planned_progress"] = np.nan
+    item, = forecast_projects(df)
+    # 30 of 40 planned days elapsed
+    assert item["planned_progress"] == 75.0
+    assert item["deviation"] == -60.0
+    assert "75.0% planned (-60.0 pts)" in summarize_forecast([item])
+
+
+def test_summary_without_planned_progress():
+    df = progress_frame(1, 30, 0.5, 0.0)
+    df["planned_progress"] = np.nan
+    df["days_remaining"] = -df["days_elapsed"]
+    item, = forecast_projects(df)
+    assert item["deviation"] is None
+    assert "no planned progress to compare against" in summarize_forecast([item])
+
+
+def test_open_upper_bound_when_some_resamples_never_finish():
+    df = pd.DataFrame({"days_elapsed": [1, 2, 3], "days_remaining": [9, 8, 7], "actual_progress": [0.0, 0.0, 3.0]})
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        item, = forecast_projects(df)
+    low, high = item["estimated_days_remaining_ci"]
+    assert high is None
+    assert low <= item["estimated_days_remaining"]
+    summary = summarize_forecast([item])
+    assert f"95% CI at least {low}" in summary and "None" not in summary
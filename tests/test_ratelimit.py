@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from api.utils import ratelimit
+from api.utils.ratelimit import ConcurrencyLimiter, InMemoryRateLimitBackend, RateLimitBackend, too_many_requests
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def hit(backend, key="k", burst=3, per_second=0.5):
+    return asyncio.run(backend.hit(key, burst, per_second))
+
+
+def test_burst_then_wait(clock):
+    backend = InMemoryRateLimitBackend()
+    assert [hit(backend) for _ in range(3)] == [0, 0, 0]
+    assert hit(backend) == pytest.approx(2.0)
+
+
+def test_tokens_refill_over_time(clock):
+    backend = InMemoryRateLimitBackend()
+    for _ in range(3):
+        hit(backend)
+    clock.now += 1.0
+    # half a token back at 0.5/s; the rest arrives one second later
+    assert hit(backend) == pytest.approx(1.0)
+    clock.now += 1.0
+    assert hit(backend) == 0
+    assert hit(backend) > 0
+
+
+def test_refill_is_capped_at_burst(clock):
+    backend = InMemoryRateLimitBackend()
+    hit(backend)
+    clock.now += 3600
+    assert [hit(backend) for _ in range(3)] == [0, 0, 0]
+    assert hit(backend) > 0
+
+
+def test_keys_are_independent_and_bounded(clock):
+    backend = InMemoryRateLimitBackend(max_keys=2)
+    for _ in range(3):
+        hit(backend, "a")
+    assert hit(backend, "a") > 0
+    assert hit(backend, "b") == 0
+    hit(backend, "c")
+    # "a" was the least recently used key and was evicted with its empty bucket
+    assert hit(backend, "a") == 0
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimitBackend()
+
+
+def test_concurrency_limiter_sheds_when_full():
+    limiter = ConcurrencyLimiter(2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.try_acquire()
+
+
+def test_retry_after_is_rounded_up():
+    assert too_many_requests("slow down", 0.2).headers["Retry-After"] == "1"
+    assert too_many_requests("slow down", 2.1).headers["Retry-After"] == "3"